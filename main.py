@@ -1,13 +1,16 @@
 import json
+import logging
 import sys
-from src.z3_solver import ZebraSolver
-from src.mistral_solver import MistralSolver
-from src.logger import Logger
-from src.prompt_generator import get_prompt
+from src.logger import Logger, LOG_FILE
+from src.log_config import LOG_LEVELS, configure_logging
+from src.pipeline import SOLVERS, InlineExecutor, finish_puzzle, get_variant, submit_puzzle
+from src.response_cache import ResponseCache, CACHE_FILE
+from src.rate_limiter import configure_limiter, get_limiter
+from src.single_flight import in_flight
 import argparse
-from src.openai_solver import OpenAISolver
-from src.deepseek_solver import DeepSeekSolver
-import re
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Solve or convert puzzles with an optional puzzle, action, and strategy.")
@@ -17,210 +20,132 @@ def parse_args():
                         help="What to do: 'solve', 'convert', or 'both'. Default=both.")
     parser.add_argument("--strategy", choices=["baseline", "cot", "multishot"], default="baseline",
                         help="Prompt strategy. Default=baseline.")
-    parser.add_argument("--llm", choices=["mistral", "openai", "deepseek"], default="mistral",
+    parser.add_argument("--llm", choices=list(SOLVERS), default="mistral",
                         help="Which LLM to use: 'mistral', 'openai' or 'deepseek'. Default=mistral.")
+    parser.add_argument("--log-file", type=str, default=LOG_FILE,
+                        help="Where to log results. A .jsonl path uses the append-only JSONL format. Default=results/log.json.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip puzzles this llm/strategy/action already has an answer for in --log-file (uses its .index sidecar).")
+    parser.add_argument("--cache", choices=["off", "on", "only"], default="off",
+                        help="LLM response cache: 'on' reuses and stores responses, 'only' never calls the API. Default=off.")
+    parser.add_argument("--cache-file", type=str, default=CACHE_FILE,
+                        help="SQLite file for the response cache. Default=results/llm_cache.sqlite.")
+    parser.add_argument("--cache-max-age", type=float, default=None,
+                        help="Evict cached responses older than this many days.")
+    parser.add_argument("--cache-max-size", type=float, default=None,
+                        help="Evict least recently used responses once the cache exceeds this many MB.")
+    parser.add_argument("--encoding", choices=["int", "bitvec", "onehot"], default="int",
+                        help="How ZebraSolver encodes house positions for LLM constraints. Default=int.")
+    parser.add_argument("--solver-backend", choices=["auto", "z3"], default="auto",
+                        help="'auto' tries the NumPy propagation solver first and falls back to Z3. Default=auto.")
+    parser.add_argument("--solution-limit", type=int, default=2,
+                        help="Count solutions of each LLM conversion up to this limit (2 = uniqueness check, 0 = off). Default=2.")
+    parser.add_argument("--solver-timeout", type=float, default=60,
+                        help="Seconds allowed per Z3 check on LLM constraints before giving up as 'unknown'. 0 = no limit. Default=60.")
+    parser.add_argument("--solver-max-memory", type=float, default=None,
+                        help="Memory limit in MB for each Z3 solver on LLM constraints.")
+    parser.add_argument("--unsat-core", action="store_true",
+                        help="Log a minimal unsat core (convert_unsat_core) for UNSAT conversions instead of the full diagnosis.")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default="INFO",
+                        help="Console log level. DEBUG adds raw responses, solver dumps and chains of thought. Default=INFO.")
+    parser.add_argument("--log-sample", type=float, default=1.0,
+                        help="Fraction of DEBUG records to keep (e.g. 0.05). Default=1.0.")
+    parser.add_argument("--quiet", action="store_true",
+                        help="High-throughput mode: only warnings and errors are written to the console.")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream LLM responses and stop reading once the JSON answer is complete; logs time to first token and to complete JSON.")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="Starting requests per second for the provider; adapts down on 429s and back up on success. Default=per-provider.")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="Cap on requests in flight to the provider at once. Default=per-provider.")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Number of LLM requests kept in flight at once. Default=1 (sequential).")
     return parser.parse_args()
 
-def clean_response(text):
-    if not isinstance(text, str):
-        text = str(text)
-
-    text = text.strip()
-
-    # Look for code fence
-    fence_pattern = r"```(?:json)?\s*(\{.*?\})\s*```"
-    fence_match = re.search(fence_pattern, text, flags=re.DOTALL)
-    if fence_match:
-        text = fence_match.group(1).strip()
-    else:
-        # remove triple backticks
-        if text.startswith("```"):
-            lines = text.splitlines()
-            if lines[0].strip().startswith("```"):
-                lines = lines[1:]
-            if lines and lines[-1].strip().startswith("```"):
-                lines = lines[:-1]
-            text = "\n".join(lines).strip()
-
-    explanation_pattern = re.compile(r'("explanation"\s*:\s*")(.*?)(")', flags=re.DOTALL)
-
-    def fix_explanation(m):
-        start = m.group(1)   # "explanation"
-        middle = m.group(2)  # the raw explanation text
-        end = m.group(3)     # the closing quote
-
-        # Escape special characters
-        middle_escaped = (middle
-                          .replace('\\', '\\\\') 
-                          .replace('"', '\\"')  
-                          .replace('\n', '\\n')    
-                          .replace('\r', '\\r')
-                          .replace('\t', '\\t'))
-
-        return f'{start}{middle_escaped}{end}'
-
-    text = explanation_pattern.sub(fix_explanation, text)
-    return text
+def close_run(logger, llm_solver, llm_provider):
+    logger.close()
+    log.info("Rate limiter stats: %s", get_limiter(llm_provider).stats())
+    log.info("In-flight coalescing: %s", in_flight.stats(llm_provider))
+    if llm_solver.cache is not None:
+        log.info("Response cache stats: %s", llm_solver.cache.stats())
+        llm_solver.cache.close()
 
 def main():
     args = parse_args()
+    configure_logging(args.log_level, args.log_sample, args.quiet)
     with open("data/puzzles.json", "r") as f:
         puzzles_dict = json.load(f)
 
     if args.puzzle is not None:
         if args.puzzle not in puzzles_dict:
-            print(f"Error: Puzzle '{args.puzzle}' not found in puzzles.json.")
+            log.error("Puzzle '%s' not found in puzzles.json.", args.puzzle)
             sys.exit(1)
         puzzles = {args.puzzle: puzzles_dict[args.puzzle]}
     else:
         puzzles = puzzles_dict
 
+    if args.concurrency < 1:
+        log.error("--concurrency must be at least 1.")
+        sys.exit(1)
+
     puzzle_selected = args.puzzle
     action = args.action.lower()        # solve, convert, or both
     strategy = args.strategy.lower()    # baseline, cot, or multishot
 
-    print(f"Running puzzle(s): {puzzle_selected if puzzle_selected else 'ALL'}")
-    print(f"Action: {action}")
-    print(f"Strategy: {strategy}")
-    print(f"LLM Provider: {args.llm}")
-
-    if args.llm == "openai":
-        llm_solver = OpenAISolver()
-    elif args.llm == "deepseek":
-        llm_solver = DeepSeekSolver()
-    else:
-        llm_solver = MistralSolver()
-    
-    logger = Logger()
-
-    for puzzle_name, puzzle_data in puzzles.items():
-        text_description = puzzle_data["text_description"]
-        puzzle_z3 = puzzle_data.get("z3_format", None)
-        puzzle_ground_truth_dict = puzzle_data["ground_truth_dict"]
-        puzzle_size = puzzle_data["size"]
-
-        print(f"\nProcessing puzzle: {puzzle_name}")
-        print("-" * 50)
-
-        do_solve = (action in ["solve", "both"])
-        do_convert = (action in ["convert", "both"])
-
-        if do_solve and do_convert:
-            variant = "full_test"
-        elif do_solve:
-            variant = "solve"
-        elif do_convert:
-            variant = "convert"
-        else:
-            variant = "unknown"
-
-        solve_dict_str = "N/A"
-        solve_time = 0
-        solve_tokens = "N/A"
-
-        convert_constraints = "N/A"
-        convert_solver_str = "N/A"
-        convert_time = 0
-        convert_tokens = "N/A"
-
-        error_msg = None
-        chain_of_thought_solve = "N/A"
-        chain_of_thought_convert = "N/A"
-        cleaned_text = ""
-
-        if do_solve:
-            prompt_solve = get_prompt("solve", strategy) + "\n" + text_description
-            llm_sol_text, rtime, tokens = llm_solver.query_llm(prompt_solve)
-            if llm_sol_text:
-                cleaned_text = clean_response(llm_sol_text)
-                solve_dict_str = cleaned_text
-                solve_time = rtime
-                solve_tokens = tokens
-                print("Cleaned response for solve:", cleaned_text)
-                print("\nLLM dictionary solution:\n", llm_sol_text)
-                if strategy == "cot":
-                    try:
-                        sol_obj = json.loads(cleaned_text)
-                        chain_of_thought_solve = sol_obj.get("explanation", "N/A")
-                        if "solution" in sol_obj:
-                            # keeping it for logging
-                            solve_dict_str = json.dumps(sol_obj["solution"])
-                    except Exception as e:
-                        print("Error parsing CoT response for puzzle solve:", e)
-            else:
-                print("No LLM puzzle solution or error from API.")
-                if cleaned_text is None:
-                    error_msg = "LLM puzzle solution is None (API error or rate limit)."
-
-        if do_convert:
-            prompt_convert = get_prompt("convert", strategy) + "\n" + text_description
-            llm_constraints_str, conv_time, conv_tokens = llm_solver.query_llm(prompt_convert)
-            if llm_constraints_str:
-                convert_time = conv_time
-                convert_tokens = conv_tokens
-                cleaned_constraints = clean_response(llm_constraints_str)
-                if strategy == "cot":
-                    try:
-                        constraints_obj = json.loads(cleaned_constraints)
-                        chain_of_thought_convert = constraints_obj.get("explanation", "N/A")
-                        z3_obj = constraints_obj.get("z3", {})
-                        convert_constraints = json.dumps(z3_obj)
-                    except Exception as e:
-                        print(f"Error parsing CoT convert response: {e}")
-                        # fallback
-                        convert_constraints = cleaned_constraints
-                else:
-                    # baseline or multishot: 
-                    convert_constraints = cleaned_constraints
-
-                try:
-                    # Parse the final constraints to solver
-                    llm_constraints_json = json.loads(convert_constraints)
-                    print("\nLLM-Generated Z3 Constraints:\n", llm_constraints_json)
-                    try:
-                        solver_llm = ZebraSolver(llm_constraints_json)
-                        solver_result = solver_llm.solve()
-                        if solver_result:
-                            convert_solver_str = json.dumps(solver_result)
-                            print("Z3 solver result from LLM constraints:", solver_result)
-                        else:
-                            print("No solver result or puzzle unsatisfiable from LLM constraints.")
-                            error_msg = error_msg or "Z3 solver returned no solution for LLM constraints."
-                    except Exception as e:
-                        error_msg = error_msg or f"Error feeding LLM constraints to solver: {str(e)}"
-                except Exception as e:
-                    print("Error: Could not parse LLM constraints as JSON.", str(e))
-                    error_msg = error_msg or f"Error parsing LLM constraints: {str(e)}"
-            else:
-                print("No valid LLM constraints or error from API.")
-                if cleaned_constraints is None:
-                    error_msg = error_msg or "LLM constraints is None (API error)."
-
-        print(chain_of_thought_solve+chain_of_thought_convert)
-        combined_chain_of_thought = "Solve: " + chain_of_thought_solve + "; Convert: " + chain_of_thought_convert
-
-        logger.log_run(
-            llm_provider=args.llm,
-            puzzle_name=puzzle_name,
-            puzzle_size=puzzle_size,
-            variant=variant,
-            strategy=strategy,
-            chain_of_thought=combined_chain_of_thought,
-            prompt=text_description,
-            puzzle_ground_truth_dict=puzzle_ground_truth_dict,
-            solve_dict_str=solve_dict_str,
-            solve_time=solve_time,
-            solve_tokens=solve_tokens,
-            convert_constraints=convert_constraints,
-            convert_solver_str=convert_solver_str,
-            convert_time=convert_time,
-            convert_tokens=convert_tokens,
-            puzzle_z3=puzzle_z3,
-            error_msg=error_msg
-        )
-
-        print("\nDone. Stopping now.")
-        print("=" * 50)
+    log.info("Running puzzle(s): %s", puzzle_selected if puzzle_selected else "ALL")
+    log.info("Action: %s", action)
+    log.info("Strategy: %s", strategy)
+    log.info("LLM Provider: %s", args.llm)
+    log.info("Concurrency: %s", args.concurrency)
+
+    llm_solver = SOLVERS[args.llm]()
+    llm_solver.stream = args.stream
+    configure_limiter(args.llm, args.rate_limit, args.max_in_flight)
+
+    if args.cache != "off":
+        llm_solver.cache = ResponseCache(args.cache_file, mode=args.cache,
+                                         max_age_days=args.cache_max_age, max_mb=args.cache_max_size)
+        log.info("Response cache: %s (%s)", args.cache, args.cache_file)
+
+    logger = Logger(args.log_file)
+    if args.resume:
+        done = logger.completed_cells()
+        variant = get_variant(action)
+        remaining = {name: data for name, data in puzzles.items()
+                     if (name, args.llm, strategy, variant) not in done}
+        log.info("Resuming: %d of %d puzzles already done, %d to run.",
+                 len(puzzles) - len(remaining), len(puzzles), len(remaining))
+        puzzles = remaining
+    solver_options = {
+        "encoding": args.encoding,
+        "solution_limit": args.solution_limit,
+        "backend": args.solver_backend,
+        "timeout": args.solver_timeout,
+        "max_memory": args.solver_max_memory,
+        "unsat_core": args.unsat_core
+    }
+
+    if args.concurrency == 1:
+        # Sequential run: same behaviour as before, one request at a time.
+        executor = InlineExecutor()
+        for puzzle_name, puzzle_data in puzzles.items():
+            futures = submit_puzzle(executor, llm_solver, puzzle_data, action, strategy)
+            finish_puzzle(logger, args.llm, puzzle_name, puzzle_data, action, strategy, futures,
+                          solver_options)
+        close_run(logger, llm_solver, args.llm)
+        return
+
+    # All requests are queued up front and the pool keeps at most N in flight.
+    # Results are collected in puzzle order so the log order matches a sequential run.
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        pending = [
+            (puzzle_name, puzzle_data, submit_puzzle(executor, llm_solver, puzzle_data, action, strategy))
+            for puzzle_name, puzzle_data in puzzles.items()
+        ]
+        for puzzle_name, puzzle_data, futures in pending:
+            finish_puzzle(logger, args.llm, puzzle_name, puzzle_data, action, strategy, futures,
+                          solver_options)
+    close_run(logger, llm_solver, args.llm)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+
+from src.benchmark import get_difficulty
+from src.logger import iter_log_entries, result_files
+
+try:
+    import pyarrow  # noqa: F401  (Parquet cache is optional)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+STRATEGIES = ("baseline", "cot", "multishot")
+
+# Only the scalar columns are kept; prompts, chains of thought and parsed solutions
+# are what make the raw logs large and none of them are needed for the stats.
+NUMERIC_COLUMNS = [
+    "solve_response_time", "solve_token_usage",
+    "solve_accuracy", "solve_correct_fields", "solve_total_fields",
+    "convert_response_time", "convert_token_usage",
+    "convert_solver_accuracy", "convert_correct_fields", "convert_total_fields",
+    "convert_solver_time",
+    "solve_first_token_time", "solve_json_time", "convert_first_token_time", "convert_json_time",
+    "constraints_accuracy", "constraints_correct_fields", "constraints_total_fields",
+]
+LABEL_COLUMNS = ["timestamp", "llm_provider", "puzzle", "puzzle_size", "variant", "strategy"]
+
+# metric -> (total fields column, correct fields column, accuracy column)
+METRICS = {
+    "solve": ("solve_total_fields", "solve_correct_fields", "solve_accuracy"),
+    "convert": ("convert_total_fields", "convert_correct_fields", "convert_solver_accuracy"),
+    "constraints": ("constraints_total_fields", "constraints_correct_fields", "constraints_accuracy"),
+}
+
+GROUPINGS = {
+    "by_model": ["model"],
+    "by_provider": ["llm_provider"],
+    "by_strategy": ["strategy"],
+    "by_difficulty": ["difficulty"],
+    "by_size": ["puzzle_size"],
+}
+
+def model_from_source(source, provider):
+    """results/openai-gpt4o-cot.json -> 'openai-gpt4o'. Falls back to the provider for other logs."""
+    for strategy in STRATEGIES:
+        if source.endswith("-" + strategy):
+            return source[:-len(strategy) - 1]
+    return provider
+
+def read_rows(path):
+    source = os.path.splitext(os.path.basename(path))[0]
+    for entry in iter_log_entries(path):
+        row = {col: entry.get(col) for col in LABEL_COLUMNS + NUMERIC_COLUMNS}
+        row["source"] = source
+        yield row
+
+def build_frame(paths):
+    df = pd.DataFrame([row for path in paths for row in read_rows(path)],
+                      columns=["source"] + LABEL_COLUMNS + NUMERIC_COLUMNS)
+    for col in NUMERIC_COLUMNS:
+        # "N/A" token counts and other junk become NaN instead of raising per entry.
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    for col in LABEL_COLUMNS:
+        df[col] = df[col].fillna("Unknown").astype(str)
+    df["model"] = [model_from_source(s, p) for s, p in zip(df["source"], df["llm_provider"])]
+    size_to_difficulty = {size: get_difficulty(size) for size in df["puzzle_size"].unique()}
+    df["difficulty"] = df["puzzle_size"].map(size_to_difficulty)
+    return df
+
+def cache_key(paths):
+    return [[p, os.stat(p).st_mtime_ns, os.stat(p).st_size] for p in paths]
+
+def load_results_frame(paths, cache=None):
+    """
+    Loads the given logs into one DataFrame. With a cache path (needs pyarrow) the
+    frame is stored as Parquet and reused until any of the source files change.
+    """
+    paths = sorted(paths)
+    if cache and not HAS_PYARROW:
+        print("pyarrow is not installed; ignoring the Parquet cache.")
+        cache = None
+
+    key_path = cache + ".key" if cache else None
+    if cache and os.path.exists(cache) and os.path.exists(key_path):
+        with open(key_path, "r") as f:
+            if json.load(f) == cache_key(paths):
+                return pd.read_parquet(cache)
+
+    df = build_frame(paths)
+    if cache:
+        df.to_parquet(cache, index=False)
+        with open(key_path, "w") as f:
+            json.dump(cache_key(paths), f)
+    return df
+
+def add_metric_columns(df):
+    """Per-row flags and ratios so every breakdown is a plain group-by sum."""
+    df = df.copy()
+    for metric, (total_col, correct_col, acc_col) in METRICS.items():
+        total = df[total_col].fillna(0)
+        valid = total > 0
+        df[f"{metric}_count"] = valid.astype(int)
+        df[f"{metric}_exact"] = ((df[acc_col] == 1) & valid).astype(int)
+        df[f"{metric}_weighted"] = (df[correct_col].fillna(0) / total).where(valid, 0.0)
+        df[f"{metric}_fields"] = total.where(valid, 0.0)
+    df["solve_tokens"] = df["solve_token_usage"].fillna(0)
+    df["convert_tokens"] = df["convert_token_usage"].fillna(0)
+    return df
+
+def summarize(sums):
+    """Turns one row of group sums into the same shape aggregate_stats produces."""
+    result = {}
+    for metric in METRICS:
+        count = int(sums[f"{metric}_count"])
+        stats = {
+            "count": count,
+            "accuracy_sum": float(sums[f"{metric}_exact"]),
+            "weighted_sum": float(sums[f"{metric}_weighted"]),
+            "total_fields": float(sums[f"{metric}_fields"]),
+        }
+        stats["averages"] = {
+            "average_accuracy": stats["accuracy_sum"] / count if count else 0,
+            "weighted_accuracy": stats["weighted_sum"] / count if count else 0,
+            "total_fields": stats["total_fields"] if count else 0,
+            "entries": count
+        }
+        result[metric] = stats
+    result["total_solve_tokens"] = float(sums["solve_tokens"])
+    result["total_convert_tokens"] = float(sums["convert_tokens"])
+    result["total_all_tokens"] = result["total_solve_tokens"] + result["total_convert_tokens"]
+    return result
+
+SUM_COLUMNS = [f"{m}_{part}" for m in METRICS for part in ("count", "exact", "weighted", "fields")] + \
+              ["solve_tokens", "convert_tokens"]
+
+def group_stats(df, keys):
+    sums = df.groupby(keys, sort=True)[SUM_COLUMNS].sum()
+    out = {}
+    for idx, row in sums.iterrows():
+        label = idx if isinstance(idx, str) else " / ".join(str(i) for i in idx)
+        out[label] = summarize(row)
+    return out
+
+def compute_stats(df):
+    df = add_metric_columns(df)
+    stats = summarize(df[SUM_COLUMNS].sum())
+    for name, keys in GROUPINGS.items():
+        stats[name] = group_stats(df, keys)
+    return stats
+
+PERCENTILES = (0.5, 0.9, 0.99)
+# Columns reported as percentiles in the comparison matrix.
+DISTRIBUTION_COLUMNS = {
+    "solve_response_time": "solve_response_time",
+    "convert_response_time": "convert_response_time",
+    "solver_time": "convert_solver_time",
+    "solve_first_token": "solve_first_token_time",
+    "solve_json": "solve_json_time",
+    "convert_first_token": "convert_first_token_time",
+    "convert_json": "convert_json_time",
+    "solve_tokens": "solve_token_usage",
+    "convert_tokens": "convert_token_usage",
+}
+MATRIX_KEYS = ["model", "strategy", "difficulty"]
+
+def percentile_table(df, keys):
+    """p50/p90/p99 of latency and token columns per group. Zero times mean no call was made."""
+    values = pd.DataFrame({name: df[col].where(df[col] > 0) for name, col in DISTRIBUTION_COLUMNS.items()})
+    values[keys] = df[keys]
+    return values.groupby(keys, sort=True).quantile(list(PERCENTILES))
+
+def distribution(table, idx):
+    out = {}
+    for name in DISTRIBUTION_COLUMNS:
+        out[name] = {}
+        for q in PERCENTILES:
+            value = table.loc[idx + (q,), name]
+            out[name][f"p{int(q * 100)}"] = None if pd.isna(value) else float(value)
+    return out
+
+def compute_matrix(df):
+    """
+    model x strategy x difficulty comparison. Each cell holds the usual accuracy
+    stats plus latency and token percentiles; difficulty "All" covers the whole run.
+    """
+    df = add_metric_columns(df)
+    all_df = df.assign(difficulty="All")
+    both = pd.concat([df, all_df], ignore_index=True)
+
+    sums = both.groupby(MATRIX_KEYS, sort=True)[SUM_COLUMNS].sum()
+    percentiles = percentile_table(both, MATRIX_KEYS)
+    providers = df.groupby("model")["llm_provider"].first()
+
+    matrix = {}
+    for idx, row in sums.iterrows():
+        model, strategy, difficulty = idx
+        cell = summarize(row)
+        cell.update(distribution(percentiles, idx))
+        model_entry = matrix.setdefault(model, {"llm_provider": providers[model]})
+        model_entry.setdefault(strategy, {})[difficulty] = cell
+    return matrix
+
+def matrix_table(matrix):
+    """Flat one-line-per-cell view of compute_matrix, for printing and diffing between runs."""
+    rows = []
+    for model, strategies in matrix.items():
+        for strategy, difficulties in strategies.items():
+            if strategy == "llm_provider":
+                continue
+            for difficulty, cell in difficulties.items():
+                rows.append({
+                    "model": model,
+                    "strategy": strategy,
+                    "difficulty": difficulty,
+                    "n": cell["solve"]["count"],
+                    "solve_acc": cell["solve"]["averages"]["weighted_accuracy"],
+                    "convert_acc": cell["convert"]["averages"]["weighted_accuracy"],
+                    "constraints_acc": cell["constraints"]["averages"]["weighted_accuracy"],
+                    "solve_p50_s": cell["solve_response_time"]["p50"],
+                    "solve_p90_s": cell["solve_response_time"]["p90"],
+                    "convert_p50_s": cell["convert_response_time"]["p50"],
+                    "convert_p90_s": cell["convert_response_time"]["p90"],
+                    "solver_p90_s": cell["solver_time"]["p90"],
+                    "tokens": cell["total_all_tokens"],
+                })
+    return pd.DataFrame(rows)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Columnar benchmark stats over one or more result logs.")
+    parser.add_argument("logs", nargs="*", help="Log files to load. Default=every results/*.json except log files.")
+    parser.add_argument("--cache", type=str, default=None,
+                        help="Optional Parquet cache path, reused until the logs change (needs pyarrow).")
+    parser.add_argument("--out", type=str, default="analytics_stats.json",
+                        help="Where to write the stats. Default=analytics_stats.json.")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    paths = args.logs or result_files()
+    start = time.time()
+    df = load_results_frame(paths, cache=args.cache)
+    stats = compute_stats(df)
+    elapsed = time.time() - start
+    with open(args.out, "w") as out_file:
+        json.dump(stats, out_file, indent=4)
+    print(f"Stats for {len(df)} entries from {len(paths)} files written to {args.out} in {elapsed:.2f}s")
@@ -0,0 +1,32 @@
+import asyncio
+import threading
+import httpx
+
+# Connection pool shared by every async provider client. Keep-alive connections are
+# reused across requests, so one event loop can keep hundreds of requests in flight.
+MAX_CONNECTIONS = 200
+MAX_KEEPALIVE_CONNECTIONS = 100
+HTTP_LIMITS = httpx.Limits(max_connections=MAX_CONNECTIONS,
+                           max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS)
+HTTP_TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_loop():
+    """
+    Returns the background event loop used by the sync query_llm wrappers.
+    The async clients are bound to the loop they first ran on, so every sync call
+    goes through this single long-lived loop instead of asyncio.run per request.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True)
+            thread.start()
+        return _loop
+
+def run_sync(coro):
+    """Runs a coroutine on the background loop and blocks until it finishes. Safe to call from many threads."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+from src.async_runner import run_sync
+from src.log_config import LOG_LEVELS, configure_logging
+from src.logger import Logger
+from src.openai_solver import OpenAISolver
+from src.pipeline import InlineExecutor, convert_result, finish_puzzle, get_variant, solve_result
+from src.prompt_generator import get_prompt
+from src.sweep import STRATEGIES, select_puzzles
+
+log = logging.getLogger(__name__)
+
+BATCH_DIR = "results/batch"
+# Providers whose solver has batch_client (an OpenAI-compatible AsyncOpenAI) and batch_request().
+BATCH_SOLVERS = {"openai": OpenAISolver}
+FINISHED = {"completed", "failed", "expired", "cancelled"}
+POLL_INTERVAL = 30
+
+def request_kinds(action):
+    return [kind for kind in ("solve", "convert") if action in (kind, "both")]
+
+def build_requests(llm_solver, puzzles, action, strategy):
+    """Batch input lines for every puzzle, with custom_id "<puzzle>:<solve|convert>"."""
+    return [llm_solver.batch_request(f"{name}:{kind}", get_prompt(kind, strategy) + "\n" + data["text_description"])
+            for name, data in puzzles.items() for kind in request_kinds(action)]
+
+async def submit_batch(client, requests_path):
+    with open(requests_path, "rb") as f:
+        input_file = await client.files.create(file=f, purpose="batch")
+    return await client.batches.create(input_file_id=input_file.id, endpoint="/v1/chat/completions",
+                                       completion_window="24h")
+
+async def wait_for_batch(client, batch_id, poll_interval=POLL_INTERVAL):
+    while True:
+        batch = await client.batches.retrieve(batch_id)
+        if batch.status in FINISHED:
+            return batch
+        counts = batch.request_counts
+        log.info("Batch %s is %s (%s/%s done).", batch_id, batch.status,
+                 counts.completed if counts else "?", counts.total if counts else "?")
+        await asyncio.sleep(poll_interval)
+
+async def download_answers(client, batch):
+    """
+    {custom_id: (text, tokens)} from the batch's output and error files. Requests
+    that failed map to (None, None) so they are logged like any other API failure.
+    """
+    answers = {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        content = await client.files.content(file_id)
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            body = response.get("body") or {}
+            if response.get("status_code") == 200 and body.get("choices"):
+                usage = body.get("usage") or {}
+                answers[record["custom_id"]] = (body["choices"][0]["message"]["content"],
+                                                usage.get("total_tokens", "N/A"))
+            else:
+                log.warning("Batch request %s failed: %s", record.get("custom_id"), record.get("error") or body)
+                answers[record["custom_id"]] = (None, None)
+    return answers
+
+def log_answers(logger, llm, puzzles, action, strategy, answers, solver_options=None):
+    """Feeds batch answers through the same clean_response / check / log_run path as a live run."""
+    executor = InlineExecutor()
+    for name, data in puzzles.items():
+        futures = {}
+        for kind, make_result in (("solve", solve_result), ("convert", convert_result)):
+            if kind in request_kinds(action):
+                text, tokens = answers.get(f"{name}:{kind}", (None, None))
+                # A batch has no per-request latency.
+                futures[kind] = executor.submit(make_result, strategy, text, "N/A", tokens)
+        finish_puzzle(logger, llm, name, data, action, strategy, futures, solver_options)
+
+def run_batch(job_file, llm, puzzles, action, strategy, log_file, poll_interval=POLL_INTERVAL, wait=True,
+              solver_options=None):
+    """
+    Submits the prompts as one batch job, or picks up the job already recorded in
+    job_file, then (with wait) polls until it finishes and logs the answers. The
+    job file keeps the batch id, so an interrupted run can be restarted without
+    submitting again. Returns the job record.
+    """
+    llm_solver = BATCH_SOLVERS[llm]()
+    client = llm_solver.batch_client
+    if os.path.exists(job_file):
+        with open(job_file, "r") as f:
+            job = json.load(f)
+        log.info("Resuming batch %s from %s.", job["batch_id"], job_file)
+    else:
+        requests_path = job_file.replace(".job.json", "") + ".requests.jsonl"
+        with open(requests_path, "w") as f:
+            for request in build_requests(llm_solver, puzzles, action, strategy):
+                f.write(json.dumps(request) + "\n")
+        batch = run_sync(submit_batch(client, requests_path))
+        job = {"batch_id": batch.id, "llm": llm, "model": llm_solver.model, "strategy": strategy,
+               "action": action, "puzzles": list(puzzles), "requests_file": requests_path,
+               "log_file": log_file, "submitted": time.time(), "status": batch.status}
+        with open(job_file, "w") as f:
+            json.dump(job, f, indent=4)
+        log.info("Submitted batch %s with %d puzzles; job saved to %s.", batch.id, len(puzzles), job_file)
+
+    if not wait or job["status"] == "logged":
+        return job
+    batch = run_sync(wait_for_batch(client, job["batch_id"], poll_interval))
+    if batch.status != "completed":
+        log.warning("Batch %s ended as %s; logging the answers it has.", batch.id, batch.status)
+    answers = run_sync(download_answers(client, batch))
+    job_puzzles = {name: puzzles[name] for name in job["puzzles"] if name in puzzles}
+    logger = Logger(job["log_file"])
+    log_answers(logger, job["llm"], job_puzzles, job["action"], job["strategy"], answers, solver_options)
+    logger.close()
+
+    job["status"] = "logged"
+    job["batch_status"] = batch.status
+    with open(job_file, "w") as f:
+        json.dump(job, f, indent=4)
+    log.info("Logged %d answers for %d puzzles to %s.", len(answers), len(job_puzzles), job["log_file"])
+    return job
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run a sweep through a provider's Batch API instead of live requests.")
+    parser.add_argument("--llm", choices=list(BATCH_SOLVERS), default="openai")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="baseline")
+    parser.add_argument("--action", choices=["solve", "convert", "both"], default="both")
+    parser.add_argument("--puzzle", nargs="+", default=None, help="Puzzle names or glob patterns. Default=all.")
+    parser.add_argument("--log-file", default=None, help="Default=results/<llm>-batch-<strategy>.json.")
+    parser.add_argument("--job-file", default=None,
+                        help=f"Batch job record; rerun with the same file to collect. Default={BATCH_DIR}/<llm>-<strategy>-<variant>.job.json.")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL, help=f"Seconds between status checks. Default={POLL_INTERVAL}.")
+    parser.add_argument("--no-wait", action="store_true", help="Submit and exit; rerun later to collect.")
+    parser.add_argument("--encoding", choices=["int", "bitvec", "onehot"], default="int")
+    parser.add_argument("--solution-limit", type=int, default=2)
+    parser.add_argument("--solver-backend", choices=["auto", "z3"], default="auto")
+    parser.add_argument("--solver-timeout", type=float, default=60)
+    parser.add_argument("--solver-max-memory", type=float, default=None)
+    parser.add_argument("--unsat-core", action="store_true")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default="INFO")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_logging(args.log_level)
+    with open("data/puzzles.json", "r") as f:
+        puzzles = select_puzzles(json.load(f), args.puzzle)
+    if not puzzles:
+        log.error("No puzzles match the filters.")
+        sys.exit(1)
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    job_file = args.job_file or os.path.join(BATCH_DIR, f"{args.llm}-{args.strategy}-{get_variant(args.action)}.job.json")
+    log_file = args.log_file or f"results/{args.llm}-batch-{args.strategy}.json"
+    solver_options = {"encoding": args.encoding, "solution_limit": args.solution_limit,
+                      "backend": args.solver_backend, "timeout": args.solver_timeout,
+                      "max_memory": args.solver_max_memory, "unsat_core": args.unsat_core}
+    job = run_batch(job_file, args.llm, puzzles, args.action, args.strategy, log_file,
+                    args.poll_interval, not args.no_wait, solver_options)
+    print(f"Batch {job['batch_id']}: {job['status']} (job file {job_file})")
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from z3 import sat, unsat
+from src.logger import iter_log_entries, result_files
+from src.propagation_solver import PropagationSolver, PropagationIncomplete
+from src.z3_solver import ZebraSolver
+
+DEFAULT_TIMEOUT = 30
+RECHECK_FILE = "recheck_report.json"
+
+def solve_job(puzzle, encoding="int", solution_limit=2, backend="auto", timeout=None, max_memory=None):
+    """
+    Solves one puzzle JSON (a dict, or the raw string an LLM returned) and returns a
+    plain dict, so it can travel back from a worker process. status is "sat",
+    "unsat", "timeout" (the job used up its timeout seconds), "unknown" (Z3 gave
+    up for another reason, e.g. max_memory) or "error"; UNSAT puzzles also get a
+    minimal unsat core as [{"index", "constraint"}]. timeout bounds the whole job:
+    solving, counting and core minimization share it, each Z3 check getting only
+    the time left. The propagation pass is bounded by its node limit instead.
+    """
+    start = time.perf_counter()
+    deadline = time.monotonic() + timeout if timeout else None
+    result = {"status": "error", "solution": None, "solution_count": None,
+              "unsat_core": None, "errors": [], "seconds": None}
+    try:
+        if isinstance(puzzle, str):
+            puzzle = json.loads(puzzle)
+        if backend == "auto":
+            try:
+                solutions = PropagationSolver(puzzle).enumerate_solutions(max(solution_limit, 1))
+                if solutions:
+                    result.update(status="sat", solution=solutions[0],
+                                  solution_count=len(solutions) if solution_limit > 0 else None)
+            except PropagationIncomplete:
+                pass
+
+        if result["status"] != "sat":
+            solver = ZebraSolver(puzzle, incremental=True, encoding=encoding,
+                                 max_memory=max_memory, deadline=deadline)
+            solver.add_constraints()
+            result["errors"] = solver.errors
+            if not solver.errors:
+                status = solver.check()
+                if status == sat:
+                    model = solver.solver.model()
+                    result["status"] = "sat"
+                    result["solution"] = {it: solver.encoding.value(model, it) for it in solver.item_vars}
+                    if solution_limit > 0:
+                        # None when Z3 gave up before the count was settled.
+                        result["solution_count"] = solver.count_solutions(solution_limit, first=result["solution"])
+                        if result["solution_count"] is None:
+                            result["errors"].append(f"Z3 gave up counting solutions: {solver.reason_unknown}")
+                elif status == unsat:
+                    result["status"] = "unsat"
+                    result["solution_count"] = 0
+                    core = solver.unsat_core()
+                    if core is not None:
+                        result["unsat_core"] = [{"index": i, "constraint": solver.constraints[i]} for i in core]
+                    if solver.deadline_passed:
+                        result["errors"].append("Ran out of time before the unsat core was minimal")
+                elif solver.deadline_passed:
+                    result["status"] = "timeout"
+                    result["errors"].append(f"Z3 ran out of the job's {timeout}s")
+                else:
+                    result["status"] = "unknown"
+                    result["errors"].append(f"Z3 gave up: {solver.reason_unknown}")
+    except Exception as e:
+        result["status"] = "error"
+        result["errors"].append(str(e))
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+def solve_batch(puzzles, workers=None, timeout=DEFAULT_TIMEOUT, encoding="int", solution_limit=2, backend="auto",
+                max_memory=None):
+    """
+    Solves many puzzle JSONs in a process pool (each worker has its own Z3 context)
+    and returns the results in input order. timeout (seconds) bounds each job and
+    max_memory (MB) each Z3 solver; a job that runs out comes back with status
+    "timeout" or "unknown" instead of holding up the batch.
+    """
+    results = [None] * len(puzzles)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(solve_job, puzzle, encoding, solution_limit, backend, timeout, max_memory): i
+                   for i, puzzle in enumerate(puzzles)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                # A crashed worker only loses its own job.
+                results[i] = {"status": "error", "solution": None, "solution_count": None,
+                              "unsat_core": None, "errors": [str(e)], "seconds": None}
+    return results
+
+def load_ground_truth(path="data/puzzles.json"):
+    with open(path, "r") as f:
+        puzzles = json.load(f)
+    return {name: p.get("ground_truth_dict") for name, p in puzzles.items()}
+
+def count_correct(solution, truth):
+    if not isinstance(solution, dict) or not isinstance(truth, dict):
+        return 0, len(truth) if isinstance(truth, dict) else 1
+    return sum(1 for k, v in truth.items() if solution.get(k) == v), len(truth)
+
+def recheck_results(paths, workers=None, timeout=DEFAULT_TIMEOUT, encoding="int", solution_limit=2, backend="auto",
+                    max_memory=None):
+    """
+    Re-solves the stored convert_constraints of every log entry in paths, without
+    calling any LLM. Returns one row per entry plus a per-file summary.
+    """
+    truth = load_ground_truth()
+    rows, puzzles = [], []
+    for path in paths:
+        for n, entry in enumerate(iter_log_entries(path)):
+            constraints = entry.get("convert_constraints")
+            if not constraints or constraints == "N/A":
+                continue
+            rows.append({"file": os.path.basename(path), "entry": n, "puzzle": entry.get("puzzle"),
+                         "strategy": entry.get("strategy"),
+                         "stored_solution": entry.get("convert_solver_str", "N/A")})
+            puzzles.append(constraints)
+
+    start = time.perf_counter()
+    results = solve_batch(puzzles, workers, timeout, encoding, solution_limit, backend, max_memory)
+    elapsed = time.perf_counter() - start
+
+    summary = {}
+    for row, result in zip(rows, results):
+        row.update(result)
+        try:
+            stored = json.loads(row["stored_solution"])
+        except (TypeError, ValueError):
+            stored = None
+        row["changed"] = stored != row["solution"]
+        row["correct_fields"], row["total_fields"] = count_correct(row["solution"], truth.get(row["puzzle"]))
+
+        file_stats = summary.setdefault(row["file"], {"checked": 0, "status": Counter(), "ambiguous": 0,
+                                                      "changed": 0, "correct_fields": 0, "total_fields": 0,
+                                                      "core_types": Counter()})
+        file_stats["checked"] += 1
+        file_stats["status"][row["status"]] += 1
+        file_stats["ambiguous"] += int(isinstance(row["solution_count"], int) and row["solution_count"] > 1)
+        file_stats["changed"] += int(row["changed"])
+        file_stats["correct_fields"] += row["correct_fields"]
+        file_stats["total_fields"] += row["total_fields"]
+        # Which constraint types the LLM gets wrong, counted over every unsat core.
+        for item in row["unsat_core"] or []:
+            file_stats["core_types"][item["constraint"].get("type")] += 1
+
+    for file_stats in summary.values():
+        file_stats["status"] = dict(file_stats["status"])
+        file_stats["core_types"] = dict(file_stats["core_types"])
+        total = file_stats["total_fields"]
+        file_stats["accuracy"] = round(file_stats["correct_fields"] / total, 4) if total else None
+    return {"seconds": round(elapsed, 2), "summary": summary, "entries": rows}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Re-solve stored LLM constraint conversions offline in a process pool.")
+    parser.add_argument("files", nargs="*", help="Result files to re-check. Default=results/*.json and *.jsonl.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes. Default=CPU count.")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Seconds allowed per puzzle, over all its Z3 checks. Default={DEFAULT_TIMEOUT}.")
+    parser.add_argument("--max-memory", type=float, default=None, help="Memory limit in MB per Z3 solver.")
+    parser.add_argument("--encoding", choices=["int", "bitvec", "onehot"], default="int")
+    parser.add_argument("--solution-limit", type=int, default=2)
+    parser.add_argument("--solver-backend", choices=["auto", "z3"], default="auto")
+    parser.add_argument("--out", default=RECHECK_FILE, help=f"Where to write the report. Default={RECHECK_FILE}.")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    files = args.files or result_files()
+    report = recheck_results(files, args.workers, args.timeout, args.encoding,
+                             args.solution_limit, args.solver_backend, args.max_memory)
+    for name, stats in sorted(report["summary"].items()):
+        print(f"{name:<32} checked={stats['checked']:<4} changed={stats['changed']:<4} "
+              f"ambiguous={stats['ambiguous']:<4} accuracy={stats['accuracy']}  {stats['status']}")
+    print(f"Re-checked {len(report['entries'])} conversions in {report['seconds']}s.")
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.out}")
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
+import argparse
 import json
 import os
 import datetime
 import sys
 
+from src.logger import iter_log_entries, result_files
+from src.quantiles import QuantileSketch
+
 #difficulty buckets.
 SMALL_SIZES = {"2x2", "2x3", "2x4", "2x5", "2x6", "3x2", "3x3", "4x2"}
 MEDIUM_SIZES = {"3x4", "3x5", "3x6", "4x3", "4x4", "5x2", "6x2"}
@@ -29,7 +33,63 @@ def parse_timestamp(ts_str):
     except Exception:
         return None
 
+def to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class PerformanceStats:
+    """
+    Latency and throughput for one bucket of entries, kept in streaming sketches
+    so the whole log never has to be held in memory.
+    """
+    def __init__(self):
+        self.solve_latency = QuantileSketch()
+        self.convert_latency = QuantileSketch()
+        # Time spent solving the converted constraints, kept apart from LLM latency.
+        self.solver_time = QuantileSketch()
+        self.solver_unknown = 0
+        self.entries = 0
+        self.busy_seconds = 0.0
+        self.timed_tokens = 0.0
+        self.timed_seconds = 0.0
+
+    def add(self, entry):
+        self.entries += 1
+        solver_seconds = to_number(entry.get("convert_solver_time"))
+        if solver_seconds is not None:
+            self.solver_time.add(solver_seconds)
+        if entry.get("convert_solver_status") == "unknown":
+            self.solver_unknown += 1
+        for kind, sketch in (("solve", self.solve_latency), ("convert", self.convert_latency)):
+            seconds = to_number(entry.get(f"{kind}_response_time"))
+            if not seconds or seconds <= 0:
+                continue
+            sketch.add(seconds)
+            self.busy_seconds += seconds
+            tokens = to_number(entry.get(f"{kind}_token_usage"))
+            if tokens is not None:
+                self.timed_tokens += tokens
+                self.timed_seconds += seconds
+
+    def result(self):
+        return {
+            "solve_latency": self.solve_latency.summary(),
+            "convert_latency": self.convert_latency.summary(),
+            "solver_time": self.solver_time.summary(),
+            "solver_unknown": self.solver_unknown,
+            "tokens_per_second": self.timed_tokens / self.timed_seconds if self.timed_seconds else 0,
+            # Per worker: puzzles finished per hour of back-to-back LLM time.
+            "puzzles_per_hour": self.entries * 3600 / self.busy_seconds if self.busy_seconds else 0,
+            "entries": self.entries
+        }
+
 def aggregate_stats(log_entries):
+    """
+    Single pass over any iterable of log entries (a list, or a generator from
+    iter_log_entries), so memory does not grow with the size of the log.
+    """
     overall = {
         "solve": {"count": 0, "accuracy_sum": 0.0, "weighted_sum": 0.0, "total_fields": 0},
         "convert": {"count": 0, "accuracy_sum": 0.0, "weighted_sum": 0.0, "total_fields": 0},
@@ -38,15 +98,23 @@ def aggregate_stats(log_entries):
         "total_convert_tokens": 0.0,
         "total_all_tokens": 0.0,
 
-        "by_difficulty": {}
+        "by_difficulty": {},
+        "by_provider": {},
+        "by_strategy": {}
     }
+    performance = PerformanceStats()
+    performance_by = {"by_difficulty": {}, "by_provider": {}, "by_strategy": {}}
     
-    timestamps = []
-    
+    earliest = None
+    latest = None
+
     for entry in log_entries:
         ts = parse_timestamp(entry.get("timestamp", ""))
         if ts:
-            timestamps.append(ts)
+            if earliest is None or ts < earliest:
+                earliest = ts
+            if latest is None or ts > latest:
+                latest = ts
         
         puzzle_size = entry.get("puzzle_size", "Unknown")
         diff = get_difficulty(puzzle_size)
@@ -56,7 +124,13 @@ def aggregate_stats(log_entries):
                 "convert": {"count": 0, "accuracy_sum": 0.0, "weighted_sum": 0.0, "total_fields": 0},
                 "constraints": {"count": 0, "accuracy_sum": 0.0, "weighted_sum": 0.0, "total_fields": 0}
             }
-        
+
+        performance.add(entry)
+        for section, key in (("by_difficulty", diff),
+                             ("by_provider", entry.get("llm_provider", "Unknown")),
+                             ("by_strategy", entry.get("strategy", "Unknown"))):
+            performance_by[section].setdefault(key, PerformanceStats()).add(entry)
+
         try:
             solve_total = float(entry.get("solve_total_fields", 0))
             solve_correct = float(entry.get("solve_correct_fields", 0))
@@ -151,25 +225,58 @@ def aggregate_stats(log_entries):
         overall["by_difficulty"][diff]["convert"]["averages"] = compute_avg(overall["by_difficulty"][diff]["convert"])
         overall["by_difficulty"][diff]["constraints"]["averages"] = compute_avg(overall["by_difficulty"][diff]["constraints"])
 
-    if timestamps:
+    overall["performance"] = performance.result()
+    for section, buckets in performance_by.items():
+        for key, stats in buckets.items():
+            overall[section].setdefault(key, {})["performance"] = stats.result()
+
+    if earliest is not None:
         overall["time_range"] = {
-            "earliest": min(timestamps).strftime("%Y-%m-%d %H:%M:%S"),
-            "latest": max(timestamps).strftime("%Y-%m-%d %H:%M:%S")
+            "earliest": earliest.strftime("%Y-%m-%d %H:%M:%S"),
+            "latest": latest.strftime("%Y-%m-%d %H:%M:%S")
         }
     else:
         overall["time_range"] = {"earliest": "N/A", "latest": "N/A"}
 
     return overall
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Aggregate benchmark statistics from result logs.")
+    parser.add_argument("log_file", nargs="?", default="results/log.json",
+                        help="Single log to aggregate. Default=results/log.json.")
+    parser.add_argument("--all", action="store_true",
+                        help="Compare every results/*.json and *.jsonl run in one model x strategy x difficulty matrix.")
+    parser.add_argument("--results-dir", type=str, default="results",
+                        help="Directory scanned by --all. Default=results.")
+    parser.add_argument("--out", type=str, default=None,
+                        help="Output file. Default=benchmarks_stats.json, or benchmark_matrix.json with --all.")
+    return parser.parse_args()
+
+def run_comparison(results_dir, out_path):
+    # pandas is only needed for the multi-run report.
+    from src.analytics import load_results_frame, compute_matrix, matrix_table
+
+    paths = result_files(results_dir)
+    if not paths:
+        print(f"No result files found in {results_dir}.")
+        sys.exit(1)
+    matrix = compute_matrix(load_results_frame(paths))
+    with open(out_path, "w") as out_file:
+        json.dump(matrix, out_file, indent=4)
+    print(matrix_table(matrix).to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    print(f"Comparison of {len(paths)} runs has been written to {out_path}")
+
 if __name__ == "__main__":
-    log_file = "results/log.json"
-    if not os.path.exists(log_file):
+    args = parse_args()
+    if args.all:
+        run_comparison(args.results_dir, args.out or "benchmark_matrix.json")
+        sys.exit(0)
+
+    if not os.path.exists(args.log_file):
         print("Log file not found.")
         sys.exit(1)
-    with open(log_file, "r") as f:
-        logs = json.load(f)
-    
-    stats = aggregate_stats(logs)
-    with open("benchmarks_stats.json", "w") as out_file:
+    stats = aggregate_stats(iter_log_entries(args.log_file))
+    out_path = args.out or "benchmarks_stats.json"
+    with open(out_path, "w") as out_file:
         json.dump(stats, out_file, indent=4)
-    print("Benchmark statistics have been written to benchmarks_stats.json")
+    print(f"Benchmark statistics have been written to {out_path}")
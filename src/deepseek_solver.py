@@ -1,42 +1,79 @@
 import time
 import os
 import json
-from openai import OpenAI
+import logging
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from dotenv import load_dotenv
+from src.async_runner import HTTP_LIMITS, HTTP_TIMEOUT, run_sync
+from src.rate_limiter import get_limiter
+from src.response_cache import cached_query
+from src.streaming import StreamCollector, read_openai_stream
 
 load_dotenv()
+log = logging.getLogger(__name__)
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
-client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com")
+async_client = AsyncOpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com",
+                           timeout=HTTP_TIMEOUT, max_retries=0,
+                           http_client=DefaultAsyncHttpxClient(limits=HTTP_LIMITS))
+SYSTEM_MESSAGE = "You are an expert puzzle solver. Output only valid JSON with no extra commentary."
 
 class DeepSeekSolver:
     def __init__(self):
         self.model = "deepseek-reasoner"
+        self.temperature = None
+        # Optional ResponseCache, set by main.py when --cache is used.
+        self.cache = None
+        # Stream completions and stop reading once the JSON answer is complete (--stream).
+        self.stream = False
 
-    def query_llm(self, prompt):
+    async def query_llm_async(self, prompt):
+        """(response, seconds, tokens), like query_llm."""
+        return (await self.query_llm_async_timed(prompt))[:3]
+
+    async def query_llm_async_timed(self, prompt):
+        """(response, seconds, tokens, stream timings or None)."""
+        return await cached_query(self.cache, "deepseek", self.model, SYSTEM_MESSAGE, prompt,
+                                  self.temperature, self.fetch, self.stream)
+
+    async def fetch(self, prompt):
         start_time = time.time()
-        retries = 10 
-        for attempt in range(retries):
-            try:
-                response = client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are an expert puzzle solver. Output only valid JSON with no extra commentary."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    stream=False
-                )
-                print(f"DeepSeek API Response: {response}")
-                llm_response = response.choices[0].message.content
-                response_time = round(time.time() - start_time, 2)
-                token_usage = response.usage.total_tokens if hasattr(response, 'usage') and response.usage.total_tokens is not None else "N/A"
-                return llm_response, response_time, token_usage
-            except Exception as e:
-                print(f"DeepSeek API error on attempt {attempt+1}: {e}")
-                wait_time = 2 ** attempt
-                print(f"Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
-        print("Error: Exceeded max retries for DeepSeek API.")
-        return None, None, None
+        messages = [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}
+        ]
+
+        async def request():
+            if self.stream:
+                collector = StreamCollector(start_time)
+                stream = await async_client.chat.completions.create(
+                    model=self.model, messages=messages,
+                    stream=True, stream_options={"include_usage": True})
+                token_usage = await read_openai_stream(stream, collector)
+                return collector.text(), round(time.time() - start_time, 2), token_usage, collector.timings()
+
+            response = await async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                stream=False
+            )
+            log.debug("DeepSeek API response: %s", response)
+            llm_response = response.choices[0].message.content
+            response_time = round(time.time() - start_time, 2)
+            token_usage = response.usage.total_tokens if hasattr(response, 'usage') and response.usage.total_tokens is not None else "N/A"
+            return llm_response, response_time, token_usage, None
+
+        try:
+            return await get_limiter("deepseek").call(request)
+        except Exception as e:
+            log.error("DeepSeek API request failed: %s", e)
+            return None, None, None, None
+
+    def query_llm_timed(self, prompt):
+        """(response, seconds, tokens, stream timings or None)."""
+        return run_sync(self.query_llm_async_timed(prompt))
+
+    def query_llm(self, prompt):
+        return self.query_llm_timed(prompt)[:3]
 
     def solve_puzzle(self, prompt):
         return self.query_llm(prompt)
@@ -48,7 +85,7 @@ class DeepSeekSolver:
                 parsed_json = json.loads(llm_response)
                 return parsed_json, response_time, token_usage
             except json.JSONDecodeError:
-                print("Error: Could not parse DeepSeek's Z3 conversion response as JSON.")
+                log.warning("Could not parse DeepSeek's Z3 conversion response as JSON.")
                 return "Error: Could not parse DeepSeek's Z3 conversion.", response_time, token_usage
         else:
             return None, response_time, token_usage
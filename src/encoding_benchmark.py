@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+from z3 import sat
+from src.logger import iter_log_entries, result_files
+from src.z3_encodings import ENCODINGS
+from src.z3_solver import ZebraSolver
+
+def generate_puzzle(houses, n_categories, seed, clues_per_item=1.0):
+    """
+    Random satisfiable zebra puzzle: a hidden permutation per category plus clues
+    that all hold for it. Not guaranteed to have a unique answer.
+    """
+    rng = random.Random(seed)
+    categories = {f"cat{c}": [f"c{c}_item{i}" for i in range(houses)] for c in range(n_categories)}
+    position = {}
+    for items in categories.values():
+        for item, house in zip(items, rng.sample(range(1, houses + 1), houses)):
+            position[item] = house
+    all_items = list(position)
+
+    constraints = [
+        {"type": "distinct_categories", "categories": list(categories)},
+        {"type": "range", "from": 1, "to": houses}
+    ]
+    n_clues = int(len(all_items) * clues_per_item)
+    while len(constraints) < n_clues + 2:
+        a, b = rng.sample(all_items, 2)
+        pa, pb = position[a], position[b]
+        kind = rng.choice(["eq", "neighbor", "leftOf", "ImmediateLeft", "neq", "eq_int", "abs_diff"])
+        if kind == "eq" and pa == pb:
+            constraints.append({"type": "eq", "var1": a, "var2": b})
+        elif kind == "neighbor" and abs(pa - pb) == 1:
+            constraints.append({"type": "neighbor", "var1": a, "var2": b})
+        elif kind == "leftOf" and pa != pb:
+            ctype = "leftOf" if pa < pb else "rightOf"
+            constraints.append({"type": ctype, "var1": a, "var2": b})
+        elif kind == "ImmediateLeft" and pa == pb - 1:
+            constraints.append({"type": "ImmediateLeft", "var1": a, "var2": b})
+        elif kind == "neq":
+            wrong = rng.choice([h for h in range(1, houses + 1) if h != pa])
+            constraints.append({"type": "neq", "var1": a, "var2int": wrong})
+        elif kind == "eq_int" and rng.random() < 0.2:
+            constraints.append({"type": "eq", "var1": a, "var2int": pa})
+        elif kind == "abs_diff" and pa != pb:
+            constraints.append({"type": "abs_diff", "var1": a, "var2": b, "diff": abs(pa - pb)})
+    return {"houses_count": houses, "categories": categories, "constraints": constraints}
+
+def stored_cases(size):
+    """Official z3_format puzzles of the given size plus every parseable LLM conversion of them."""
+    with open("data/puzzles.json", "r") as f:
+        puzzles = json.load(f)
+    wanted = {name for name, p in puzzles.items() if p["size"] == size}
+    cases = [(f"{name} (official)", puzzles[name]["z3_format"])
+             for name in sorted(wanted) if "z3_format" in puzzles[name]]
+    for path in result_files():
+        for entry in iter_log_entries(path):
+            if entry.get("puzzle") not in wanted:
+                continue
+            try:
+                z3_obj = json.loads(entry.get("convert_constraints", ""))
+            except (TypeError, ValueError):
+                continue
+            if isinstance(z3_obj, dict) and {"houses_count", "categories", "constraints"} <= set(z3_obj):
+                cases.append((f"{entry['puzzle']} ({os.path.basename(path)})", z3_obj))
+    return cases
+
+def time_solve(puzzle, encoding, repeats):
+    """
+    Median wall time of building a ZebraSolver, encoding the constraints
+    (add_constraints) and one check(), plus whether that check was sat.
+    """
+    times = []
+    ok = False
+    for _ in range(repeats):
+        start = time.perf_counter()
+        try:
+            solver = ZebraSolver(puzzle, encoding=encoding)
+            solver.add_constraints()
+            ok = not solver.errors and solver.check() == sat
+        except Exception:
+            ok = False
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), ok
+
+def run(label, cases, encodings, repeats):
+    totals = {enc: 0.0 for enc in encodings}
+    solved = {enc: 0 for enc in encodings}
+    for _, puzzle in cases:
+        for enc in encodings:
+            seconds, ok = time_solve(puzzle, enc, repeats)
+            totals[enc] += seconds
+            solved[enc] += ok
+    cells = "  ".join(f"{enc}: {totals[enc] * 1000 / len(cases):8.2f} ms ({solved[enc]}/{len(cases)} sat)"
+                      for enc in encodings)
+    print(f"{label:<28} {cells}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare ZebraSolver encodings on stored and generated puzzles.")
+    parser.add_argument("--encodings", nargs="+", default=list(ENCODINGS), choices=list(ENCODINGS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[6, 8, 10, 12],
+                        help="Generated NxN puzzle sizes. Default=6 8 10 12.")
+    parser.add_argument("--per-size", type=int, default=5, help="Generated puzzles per size. Default=5.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per puzzle (median). Default=3.")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    print("Mean time per puzzle (encode + check):")
+    cases = stored_cases("6x6")
+    if cases:
+        run(f"6x6 stored ({len(cases)})", cases, args.encodings, args.repeats)
+    for n in args.sizes:
+        generated = [(f"gen{n}-{seed}", generate_puzzle(n, n, seed)) for seed in range(args.per_size)]
+        run(f"{n}x{n} generated ({len(generated)})", generated, args.encodings, args.repeats)
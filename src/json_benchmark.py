@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import re
+import time
+
+from src.json_extract import parse_json
+from src.logger import iter_log_entries, result_files
+
+def regex_clean_response(text):
+    """The regex-based clean_response that main.py used before json_extract, kept as the baseline."""
+    if not isinstance(text, str):
+        text = str(text)
+    text = text.strip()
+    fence_match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", text, flags=re.DOTALL)
+    if fence_match:
+        text = fence_match.group(1).strip()
+    elif text.startswith("```"):
+        lines = text.splitlines()
+        if lines[0].strip().startswith("```"):
+            lines = lines[1:]
+        if lines and lines[-1].strip().startswith("```"):
+            lines = lines[:-1]
+        text = "\n".join(lines).strip()
+
+    def fix_explanation(m):
+        middle = (m.group(2).replace('\\', '\\\\').replace('"', '\\"')
+                  .replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t'))
+        return f"{m.group(1)}{middle}{m.group(3)}"
+
+    return re.sub(r'("explanation"\s*:\s*")(.*?)(")', fix_explanation, text, flags=re.DOTALL)
+
+def old_pipeline(text):
+    return json.loads(regex_clean_response(text).replace("'", "\""))
+
+def new_pipeline(text):
+    return parse_json(text)
+
+def stored_responses(paths):
+    """
+    Stored answers from the result logs, plus a raw-looking CoT version of each
+    (prose, code fence, multi-line explanation) like the models actually send.
+    """
+    stored, raw = [], []
+    for path in paths:
+        for entry in iter_log_entries(path):
+            for key in ("solve_dict_str", "convert_constraints"):
+                text = entry.get(key)
+                if not isinstance(text, str) or text == "N/A":
+                    continue
+                stored.append(text)
+                explanation = str(entry.get("chain_of_thought", ""))
+                raw.append("Here is my answer.\n```json\n{\"explanation\": \"" + explanation +
+                           "\",\n \"solution\": " + text + "}\n```\nLet me know if you need more.")
+    return stored, raw
+
+def measure(pipeline, texts, repeats):
+    best = None
+    parsed = 0
+    for _ in range(repeats):
+        parsed = 0
+        start = time.perf_counter()
+        for text in texts:
+            try:
+                pipeline(text)
+                parsed += 1
+            except Exception:
+                pass
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, parsed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare the regex clean_response with the single-pass JSON extractor.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed passes per pipeline (best is kept). Default=3.")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    paths = result_files()
+    stored, raw = stored_responses(paths)
+    for label, texts in (("stored", stored), ("raw CoT", raw)):
+        total_kb = sum(len(t) for t in texts) / 1024
+        print(f"{label}: {len(texts)} responses, {total_kb:.0f} KB")
+        for name, pipeline in (("regex clean_response", old_pipeline), ("json_extract", new_pipeline)):
+            seconds, parsed = measure(pipeline, texts, args.repeats)
+            print(f"  {name:<22} {seconds * 1e6 / len(texts):8.1f} us/response  parsed {parsed}/{len(texts)}")
@@ -0,0 +1,251 @@
+import json
+import re
+
+# Python literals that show up when a model answers with a dict repr.
+LITERALS = {"True": "true", "False": "false", "None": "null"}
+# Characters that can follow the real end of a string; any other quote is part of the text.
+AFTER_STRING = ",:}]"
+# Everything inside a string that needs a decision; the rest is copied verbatim.
+STRING_SPECIAL = re.compile(r"[\"'\\\x00-\x1f]")
+JSON_ESCAPES = "\"\\/bfnrtu"
+ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+
+class JSONExtractor:
+    """
+    Single-pass, incremental extraction of the first balanced JSON object in LLM
+    output. Text before the first "{" (prose, code fences) is skipped and the
+    object is re-emitted as valid JSON on the fly, repairing what models commonly
+    get wrong:
+
+    - single-quoted strings and True/False/None (Python dict reprs)
+    - trailing commas before "}" or "]"
+    - raw newlines/tabs and unescaped double quotes inside strings (a quote only
+      ends a string when the next non-space character is , : } or ])
+
+    feed() can be called with chunks as they arrive; it returns True once the
+    object is complete, result() then gives the repaired JSON text and end the
+    index just past the object in the last chunk fed.
+    completed_keys holds the top-level keys whose values are fully read, so a
+    streaming caller can stop as soon as the member it needs is in (see snapshot()).
+    """
+    def __init__(self):
+        self.out = []
+        self.depth = 0
+        self.started = False
+        self.done = False
+        self.end = None
+        self.quote = None           # quote character of the string being read
+        self.escaped = False
+        self.closing = None         # whitespace seen after a possible closing quote
+        self.token = []             # bare word outside strings (numbers, true, None, ...)
+        self.trailing_comma = None  # index in self.out of a comma that may turn out to be trailing
+        self.expect_key = False     # next string at depth 1 is a key
+        self.key_start = None       # index in self.out where that key's text starts
+        self.key = None             # top-level key whose value is being read
+        self.completed_keys = set()
+
+    def feed(self, chunk, start=0):
+        """Reads chunk from index start on; returns True once the object is complete."""
+        i, n = start, len(chunk)
+        while i < n and not self.done:
+            if not self.started:
+                i = chunk.find("{", i)
+                if i < 0:
+                    break
+                self.started = True
+            if self.quote is not None and self.closing is None and not self.escaped:
+                # Copy plain string content in one slice instead of char by char.
+                m = STRING_SPECIAL.search(chunk, i)
+                end = m.start() if m else n
+                if end > i:
+                    self.emit(chunk[i:end])
+                    i = end
+                    continue
+            c = chunk[i]
+            i += 1
+            if self.closing is not None:
+                self.closing_char(c)
+            elif self.quote is not None:
+                self.string_char(c)
+            else:
+                self.value_char(c)
+        if self.done and self.end is None:
+            self.end = i
+        return self.done
+
+    def emit(self, text):
+        self.out.append(text)
+
+    def flush_token(self):
+        if self.token:
+            word = "".join(self.token)
+            self.emit(LITERALS.get(word, word))
+            self.token = []
+            self.trailing_comma = None
+
+    def value_char(self, c):
+        if c in "\"'":
+            self.flush_token()
+            self.trailing_comma = None
+            self.quote = c
+            self.emit('"')
+            if self.depth == 1 and self.expect_key:
+                self.key_start = len(self.out)
+        elif c in "{[":
+            self.flush_token()
+            self.trailing_comma = None
+            self.depth += 1
+            self.expect_key = self.depth == 1
+            self.emit(c)
+        elif c in "}]":
+            self.flush_token()
+            if self.trailing_comma is not None:
+                self.out[self.trailing_comma] = ""
+                self.trailing_comma = None
+            self.depth -= 1
+            self.emit(c)
+            if self.depth <= 1:
+                self.complete_member()
+            if self.depth == 0:
+                self.done = True
+        elif c == ",":
+            self.flush_token()
+            if self.depth == 1:
+                self.complete_member()
+                self.expect_key = True
+            self.trailing_comma = len(self.out)
+            self.emit(c)
+        elif c == ":":
+            self.flush_token()
+            self.trailing_comma = None
+            self.emit(c)
+        elif c.isspace():
+            self.flush_token()
+            self.emit(c)
+        else:
+            self.token.append(c)
+
+    def string_char(self, c):
+        if self.escaped:
+            self.escaped = False
+            if c in JSON_ESCAPES:
+                self.emit("\\" + c)
+            elif c == "'":
+                # \' is not a JSON escape; inside a string it is just an apostrophe.
+                self.emit("'")
+            elif c in ESCAPES:
+                # Backslash at the end of a line: keep the line break.
+                self.emit(ESCAPES[c])
+            else:
+                # Stray backslash (e.g. "\$"): keep it as a literal backslash.
+                self.emit("\\\\")
+                self.string_char(c)
+        elif c == "\\":
+            self.escaped = True
+        elif c == self.quote:
+            self.closing = []
+        elif c == '"':
+            self.emit('\\"')
+        elif c in ESCAPES:
+            self.emit(ESCAPES[c])
+        elif c < " ":
+            self.emit(f"\\u{ord(c):04x}")
+        else:
+            self.emit(c)
+
+    def closing_char(self, c):
+        if c.isspace():
+            self.closing.append(c)
+            return
+        whitespace, self.closing = self.closing, None
+        if c in AFTER_STRING:
+            self.quote = None
+            if self.key_start is not None:
+                self.key = "".join(self.out[self.key_start:])
+                self.key_start = None
+                self.expect_key = False
+            self.emit('"')
+            self.emit("".join(whitespace))
+            self.value_char(c)
+            return
+        # The quote was part of the text: keep it and carry on inside the string.
+        self.emit('\\"' if self.quote == '"' else "'")
+        for w in whitespace:
+            self.emit(ESCAPES.get(w, w))
+        self.string_char(c)
+
+    def complete_member(self):
+        if self.key is not None:
+            self.completed_keys.add(self.key)
+            self.key = None
+
+    def result(self):
+        """The repaired JSON text, or None if no complete object has been seen."""
+        return "".join(self.out) if self.done else None
+
+    def snapshot(self):
+        """
+        The object read so far, closed after its last complete top-level member, or
+        None if reading stopped in the middle of a member.
+        """
+        if self.done:
+            return self.result()
+        if self.depth != 1 or self.quote is not None or self.token or self.key is not None:
+            return None
+        out = list(self.out)
+        if self.trailing_comma is not None:
+            out[self.trailing_comma] = ""
+        return "".join(out) + "}"
+
+def locate_json(text):
+    """
+    (repaired JSON text, parsed object) for the first balanced JSON object in text,
+    or (None, None). Scanning starts at the first code fence if there is one, and an
+    object that still is not valid JSON (e.g. "{name: house}" in prose) is skipped
+    in favour of the next one after it; objects nested inside it are never tried
+    on their own. Each part of text is scanned about once.
+    """
+    if not isinstance(text, str):
+        text = str(text)
+    fence = text.find("```")
+    start = text.find("{", fence) if fence >= 0 else -1
+    if start < 0:
+        start = text.find("{")
+    if start < 0:
+        return None, None
+    try:
+        # Already valid JSON (the usual case): no repair needed. Only tried once, as
+        # a failed raw_decode costs time proportional to its offset into text.
+        obj, end = json.JSONDecoder().raw_decode(text, start)
+        return text[start:end], obj
+    except ValueError:
+        pass
+    while start >= 0:
+        extractor = JSONExtractor()
+        extractor.feed(text, start)
+        candidate = extractor.result()
+        if candidate is None:
+            return None, None
+        try:
+            return candidate, json.loads(candidate)
+        except ValueError:
+            start = text.find("{", extractor.end)
+    return None, None
+
+def extract_json(text):
+    """Repaired text of the first balanced JSON object in text, or None."""
+    return locate_json(text)[0]
+
+def parse_json(text):
+    """
+    json.loads for LLM output: strict parsing first, then the repaired first object.
+    Raises ValueError if neither works.
+    """
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        pass
+    extracted, obj = locate_json(text)
+    if extracted is None:
+        raise ValueError("No complete JSON object found.")
+    return obj
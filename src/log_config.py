@@ -0,0 +1,35 @@
+import logging
+import random
+import sys
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+class SampleFilter(logging.Filter):
+    """
+    Keeps only a fraction of DEBUG records, which carry the bulky payloads (raw API
+    responses, Z3 solver dumps, chains of thought). INFO and above always pass.
+    Dropped records are never formatted, so their payloads cost nothing to skip.
+    """
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+def configure_logging(level="INFO", sample_rate=1.0, quiet=False):
+    """
+    Sets up console logging for a run. quiet=True is the high-throughput mode: only
+    warnings and errors are written.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler.addFilter(SampleFilter(sample_rate))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(logging.WARNING if quiet else level)
+    # The HTTP clients log every request at INFO; keep them to warnings.
+    for name in ("httpx", "httpcore", "openai"):
+        logging.getLogger(name).setLevel(logging.WARNING)
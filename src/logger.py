@@ -1,16 +1,283 @@
+import atexit
+import glob
 import json
+import logging
 import os
+import sys
+import tempfile
+import threading
 import time
+from src.json_extract import parse_json
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+log = logging.getLogger(__name__)
 
 LOG_FILE = "results/log.json"
+# JSONL records are flushed on every write but only fsynced once per batch.
+FSYNC_BATCH_SIZE = 25
+
+class FileLock:
+    """
+    Exclusive inter-process lock on a sidecar '<log>.lock' file. The log itself
+    can't be locked because atomic writes replace it with a new inode.
+    """
+    def __init__(self, path):
+        self.path = path + ".lock"
+        self.handle = None
+
+    def __enter__(self):
+        self.handle = open(self.path, "a+")
+        if fcntl is not None:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX)
+        else:
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if fcntl is not None:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+        else:
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        self.handle.close()
+        self.handle = None
+
+def atomic_write_json(path, data):
+    """Writes to a temp file in the same directory, fsyncs it, then renames it over the target."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def is_jsonl(path):
+    return path.endswith(".jsonl")
+
+def iter_jsonl(path, offset=0):
+    """
+    Yields one entry per line, starting at byte offset (a line boundary). A torn
+    last line from a crash is skipped, not fatal.
+    """
+    with open(path, "r") as f:
+        f.seek(offset)
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                log.warning("Skipping unreadable log line %d in %s: %s", line_no, path, e)
+
+def iter_json_array(path, chunk_size=1 << 16):
+    """
+    Yields the elements of a top-level JSON array one at a time, reading the file in
+    chunks, so memory stays bounded by the largest single entry rather than the log.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        buf = f.read(chunk_size)
+        eof = not buf
+        pos = 0
+
+        def fill(pos):
+            nonlocal buf, eof
+            more = f.read(chunk_size)
+            if not more:
+                eof = True
+            buf = buf[pos:] + more
+            return 0
+
+        # Skip to the opening bracket
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            pos = fill(pos)
+        if pos >= len(buf) or buf[pos] != "[":
+            raise ValueError(f"{path} does not contain a JSON array")
+        pos += 1
+
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ","):
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    raise ValueError(f"Unexpected end of file in {path}")
+                pos = fill(pos)
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                entry, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                pos = fill(pos)
+                continue
+            if end == len(buf) and not eof:
+                # A scalar could continue into the next chunk; decode it again with more data.
+                pos = fill(pos)
+                continue
+            yield entry
+            pos = end
+            if pos > chunk_size:
+                buf = buf[pos:]
+                pos = 0
+
+def result_files(results_dir="results"):
+    """
+    Run logs in results_dir, in either format, sorted. The default log.json and
+    testing_log.json (and their .jsonl forms) are scratch logs and left out, as are
+    the .lock/.index sidecars.
+    """
+    paths = glob.glob(os.path.join(results_dir, "*.json")) + glob.glob(os.path.join(results_dir, "*.jsonl"))
+    return sorted(p for p in paths if os.path.splitext(os.path.basename(p))[0] not in ("log", "testing_log"))
+
+def iter_log_entries(path):
+    """Streams entries from either log format without loading the whole file."""
+    if is_jsonl(path):
+        return iter_jsonl(path)
+    return iter_json_array(path)
+
+def load_log_entries(path):
+    """Reads a whole log in either the JSON array or the JSONL format."""
+    if is_jsonl(path):
+        return list(iter_jsonl(path))
+    with open(path, "r") as f:
+        return json.load(f)
+
+def convert_json_to_jsonl(src, dst):
+    entries = load_log_entries(src)
+    with open(dst, "w") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    return len(entries)
+
+def convert_jsonl_to_json(src, dst):
+    entries = load_log_entries(src)
+    atomic_write_json(dst, entries)
+    return len(entries)
+
+def entry_cell(entry):
+    """
+    The (puzzle, llm, strategy, variant) cell an entry completes, or None when the
+    LLM never answered (API error), so a resumed run tries that cell again.
+    """
+    variant = entry.get("variant")
+    solved = entry.get("solve_dict_str", "N/A") != "N/A"
+    converted = entry.get("convert_constraints", "N/A") != "N/A"
+    if not {"full_test": solved and converted, "solve": solved, "convert": converted}.get(variant, False):
+        return None
+    return entry.get("puzzle"), entry.get("llm_provider"), entry.get("strategy"), variant
+
+class CheckpointIndex:
+    """
+    Sidecar '<log>.index' that lets a run resume without re-reading the log. One
+    JSON line per entry written: {"cell": [puzzle, llm, strategy, variant] or null,
+    "log_size": bytes in the log after the write}. The log is only read again for
+    what the index has not seen: the tail of a JSONL log, or everything if the
+    index is missing, torn, or the log was rewritten by something else.
+    """
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self.path = log_file + ".index"
+
+    def add(self, entry, size_before):
+        """
+        Records an entry just written to a log that held size_before bytes before
+        the write; call under the log's FileLock. If the index does not end where
+        that write started (an existing log with no index yet, or writes the index
+        never saw), it is caught up from the log instead, which covers this entry.
+        """
+        if self.indexed_size() != size_before:
+            self.refresh()
+            return
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"cell": entry_cell(entry), "log_size": os.path.getsize(self.log_file)}) + "\n")
+
+    def indexed_size(self):
+        """Log size the index covers: 0 without an index, None if its last line is torn."""
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+            if end == 0:
+                return 0
+            f.seek(max(0, end - 4096))
+            tail = f.read()
+        if not tail.endswith(b"\n"):
+            return None
+        try:
+            return json.loads(tail.splitlines()[-1])["log_size"]
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def completed_cells(self):
+        """Set of (puzzle, llm, strategy, variant) cells the log already has an answer for."""
+        with FileLock(self.log_file):
+            return self.refresh()
+
+    def refresh(self):
+        """Brings the index up to date with the log and returns its cells; call under the log's FileLock."""
+        cells, indexed_size = set(), 0
+        if os.path.exists(self.path):
+            for record in iter_jsonl(self.path):
+                if record["cell"] is not None:
+                    cells.add(tuple(record["cell"]))
+                if record["log_size"] is not None:
+                    indexed_size = record["log_size"]
+        torn = self.indexed_size() is None
+        log_size = os.path.getsize(self.log_file) if os.path.exists(self.log_file) else 0
+        if indexed_size == log_size and not torn:
+            return cells
+
+        if is_jsonl(self.log_file) and 0 < indexed_size < log_size and not torn:
+            # Entries appended after the last indexed one (e.g. by an older version).
+            mode, entries = "a", iter_jsonl(self.log_file, indexed_size)
+        else:
+            mode, entries, cells = "w", iter_log_entries(self.log_file), set()
+        new_cells = {cell for cell in map(entry_cell, entries) if cell is not None}
+        cells |= new_cells
+        with open(self.path, mode) as f:
+            for cell in new_cells:
+                f.write(json.dumps({"cell": cell, "log_size": None}) + "\n")
+            f.write(json.dumps({"cell": None, "log_size": log_size}) + "\n")
+        return cells
 
 class Logger:
-    def __init__(self):
-        if not os.path.exists("results"):
-            os.makedirs("results")
-        if not os.path.exists(LOG_FILE):
-            with open(LOG_FILE, "w") as f:
-                json.dump([], f)
+    def __init__(self, log_file=LOG_FILE):
+        self.log_file = log_file
+        self.jsonl = is_jsonl(log_file)
+        self.index = CheckpointIndex(log_file)
+        self.jsonl_handle = None
+        self.unsynced = 0
+        # Guards the shared JSONL handle between threads; FileLock covers other processes.
+        self.thread_lock = threading.Lock()
+
+        log_dir = os.path.dirname(log_file)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        with FileLock(log_file):
+            if not os.path.exists(log_file):
+                if self.jsonl:
+                    open(log_file, "a").close()
+                else:
+                    atomic_write_json(log_file, [])
 
     def compare_dict_solution(self, llm_sol, puzzle_sol):
         if not isinstance(llm_sol, dict) or not isinstance(puzzle_sol, dict):
@@ -126,7 +393,16 @@ class Logger:
         convert_time,
         convert_tokens,
         puzzle_z3=None,
-        error_msg=None
+        error_msg=None,
+        convert_solution_count="N/A",
+        convert_solution_limit="N/A",
+        convert_solver_status="N/A",
+        convert_solver_time="N/A",
+        convert_unsat_core="N/A",
+        solve_first_token_time="N/A",
+        solve_json_time="N/A",
+        convert_first_token_time="N/A",
+        convert_json_time="N/A"
     ):
         if solve_dict_str == "N/A":
             direct_sol_acc = 0.0
@@ -135,8 +411,7 @@ class Logger:
             direct_sol_parsed = "N/A"
         else:
             try:
-                parse_text = solve_dict_str.replace("'", "\"")
-                direct_sol_parsed = json.loads(parse_text)
+                direct_sol_parsed = parse_json(solve_dict_str)
             except Exception as e:
                 direct_sol_parsed = f"Parse error: {str(e)}"
                 direct_sol_acc = 0.0
@@ -156,8 +431,7 @@ class Logger:
             convert_sol_parsed = "N/A"
         else:
             try:
-                parse_text = convert_solver_str.replace("'", "\"")
-                convert_sol_parsed = json.loads(parse_text)
+                convert_sol_parsed = parse_json(convert_solver_str)
             except Exception as e:
                 convert_sol_parsed = f"Parse error: {str(e)}"
                 convert_sol_acc = 0.0
@@ -199,6 +473,9 @@ class Logger:
             "solve_dict_str": solve_dict_str,
             "solve_response_time": solve_time,
             "solve_token_usage": solve_tokens,
+            # Streaming only (--stream): seconds to the first token and to the complete JSON answer
+            "solve_first_token_time": solve_first_token_time,
+            "solve_json_time": solve_json_time,
             "solve_accuracy": direct_sol_acc,
             "solve_correct_fields": direct_sol_correct,
             "solve_total_fields": direct_sol_total,
@@ -207,8 +484,18 @@ class Logger:
             "convert_constraints": convert_constraints,
             "convert_response_time": convert_time,
             "convert_token_usage": convert_tokens,
+            "convert_first_token_time": convert_first_token_time,
+            "convert_json_time": convert_json_time,
             "convert_solver_str": convert_solver_str,
             "convert_solver_accuracy": convert_sol_acc,
+            # Solutions the LLM constraints admit, counted up to the limit (1 = unique; "unknown" if Z3 gave up)
+            "convert_solution_count": convert_solution_count,
+            "convert_solution_limit": convert_solution_limit,
+            # sat / unsat / unknown (timeout or memory limit) / error, and seconds spent solving
+            "convert_solver_status": convert_solver_status,
+            "convert_solver_time": convert_solver_time,
+            # Minimal set of the LLM's constraints that is UNSAT on its own: [{"index", "constraint"}]
+            "convert_unsat_core": convert_unsat_core,
             "convert_correct_fields": convert_sol_correct,
             "convert_total_fields": convert_sol_total,
             "convert_solver_parsed": convert_sol_parsed,
@@ -220,12 +507,73 @@ class Logger:
             "error": error_msg if error_msg else "N/A"
         }
 
-        with open(LOG_FILE, "r+") as f:
-            logs = json.load(f)
+        self.write_entry(entry)
+
+    def write_entry(self, entry):
+        with self.thread_lock, FileLock(self.log_file):
+            size_before = os.path.getsize(self.log_file)
+            if self.jsonl:
+                self.append_jsonl(entry)
+                self.index.add(entry, size_before)
+                return
+
+            # Read-modify-write under the lock, then swap the file in atomically so
+            # a crash mid-write leaves the previous valid array in place.
+            with open(self.log_file, "r") as f:
+                logs = json.load(f)
             logs.append(entry)
-            f.seek(0)
-            json.dump(logs, f, indent=4)
+            atomic_write_json(self.log_file, logs)
+            self.index.add(entry, size_before)
+
+    def append_jsonl(self, entry):
+        # One buffered append per record instead of rewriting the whole array.
+        if self.jsonl_handle is None:
+            self.jsonl_handle = open(self.log_file, "a")
+            atexit.register(self.close)
+        line = json.dumps(entry) + "\n"
+        if not self.ends_with_newline():
+            # Another writer crashed mid-record; start ours on a fresh line.
+            line = "\n" + line
+        self.jsonl_handle.write(line)
+        self.jsonl_handle.flush()
+        self.unsynced += 1
+        if self.unsynced >= FSYNC_BATCH_SIZE:
+            self.sync()
+
+    def ends_with_newline(self):
+        with open(self.log_file, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return True
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def sync(self):
+        if self.jsonl_handle is not None and self.unsynced:
+            os.fsync(self.jsonl_handle.fileno())
+            self.unsynced = 0
+
+    def close(self):
+        with self.thread_lock:
+            if self.jsonl_handle is not None:
+                self.sync()
+                self.jsonl_handle.close()
+                self.jsonl_handle = None
+
+    def completed_cells(self):
+        return self.index.completed_cells()
 
     def read_logs(self):
-        with open(LOG_FILE, "r") as f:
-            return json.load(f)
+        return load_log_entries(self.log_file)
+
+if __name__ == "__main__":
+    # python -m src.logger results/log.json results/log.jsonl  (direction follows the extensions)
+    if len(sys.argv) != 3:
+        print("Usage: python -m src.logger <source log> <destination log>")
+        sys.exit(1)
+    src, dst = sys.argv[1], sys.argv[2]
+    if is_jsonl(dst):
+        count = convert_json_to_jsonl(src, dst)
+    else:
+        count = convert_jsonl_to_json(src, dst)
+    print(f"Converted {count} entries from {src} to {dst}")
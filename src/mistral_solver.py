@@ -1,58 +1,104 @@
-import requests
+import httpx
 import time
 from dotenv import load_dotenv
 import os
 import json
+import logging
+from src.async_runner import HTTP_LIMITS, HTTP_TIMEOUT, run_sync
+from src.rate_limiter import get_limiter
+from src.response_cache import cached_query
+from src.streaming import StreamCollector, read_sse_stream
 
 load_dotenv()
+log = logging.getLogger(__name__)
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
+SYSTEM_MESSAGE = ("You are an expert puzzle solver. Output only the final dictionary or JSON, "
+                  "with no extra commentary or explanations.")
 
 class MistralSolver:
     def __init__(self):
         self.api_key = MISTRAL_API_KEY
         self.url = "https://api.mistral.ai/v1/chat/completions"
-
-    def query_llm(self, prompt):
+        self.model = "mistral-small-latest"
+        self.temperature = 0.3
+        # Optional ResponseCache, set by main.py when --cache is used.
+        self.cache = None
+        # Stream completions and stop reading once the JSON answer is complete (--stream).
+        self.stream = False
+        # Created on first use so it binds to the event loop that runs the requests.
+        self.http_client = None
+
+    def get_http_client(self):
+        if self.http_client is None:
+            self.http_client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        return self.http_client
+
+    async def query_llm_async(self, prompt):
+        """(response, seconds, tokens), like query_llm."""
+        return (await self.query_llm_async_timed(prompt))[:3]
+
+    async def query_llm_async_timed(self, prompt):
+        """(response, seconds, tokens, stream timings or None)."""
+        return await cached_query(self.cache, "mistral", self.model, SYSTEM_MESSAGE, prompt,
+                                  self.temperature, self.fetch, self.stream)
+
+    async def fetch(self, prompt):
         start_time = time.time()
         headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
 
         data = {
-            "model": "mistral-small-latest",
+            "model": self.model,
             "messages": [
-                {"role": "system", "content": "You are an expert puzzle solver. Output only the final dictionary or JSON, "
-                        "with no extra commentary or explanations."},
+                {"role": "system", "content": SYSTEM_MESSAGE},
                 {"role": "user", "content": prompt}
             ],
-            "temperature": 0.3
+            "temperature": self.temperature
         }
 
-        retries = 10 
-        for attempt in range(retries):
-            response = requests.post(self.url, json=data, headers=headers)
-            response_json = response.json()
-
-            # Debugging print
-            print(f"Mistral API Response: {response_json}")
+        async def request():
+            if self.stream:
+                return await self.fetch_stream(data, headers, start_time)
 
-            # Handle rate limit errors
-            if "message" in response_json and "rate limit exceeded" in response_json["message"].lower():
-                wait_time = (2 ** attempt)
-                print(f"Rate limit exceeded. Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
-                continue
+            response = await self.get_http_client().post(self.url, json=data, headers=headers)
+            log.debug("Mistral API response: %s", response.text)
+            # 429 (rate limit) and 5xx are retried by the limiter, honouring Retry-After.
+            response.raise_for_status()
+            response_json = response.json()
 
             if "choices" not in response_json:
-                print("Error: Mistral API did not return 'choices'. Full response:", response_json)
-                return None, None, None
+                log.error("Mistral API did not return 'choices'. Full response: %s", response_json)
+                return None, None, None, None
 
             llm_response = response_json["choices"][0]["message"]["content"]
             response_time = round(time.time() - start_time, 2)
             token_usage = response_json.get("usage", {}).get("total_tokens", "N/A")
 
-            return llm_response, response_time, token_usage
+            return llm_response, response_time, token_usage, None
+
+        try:
+            return await get_limiter("mistral").call(request)
+        except Exception as e:
+            log.error("Mistral API request failed: %s", e)
+            return None, None, None, None
+
+    async def fetch_stream(self, data, headers, start_time):
+        """One streamed request; HTTP errors are raised for the limiter to handle."""
+        collector = StreamCollector(start_time)
+        async with self.get_http_client().stream("POST", self.url, json={**data, "stream": True},
+                                                 headers=headers) as response:
+            if response.status_code != 200:
+                await response.aread()
+                log.debug("Mistral API response: %s", response.text)
+                response.raise_for_status()
+            token_usage = await read_sse_stream(response, collector)
+        return collector.text(), round(time.time() - start_time, 2), token_usage, collector.timings()
+
+    def query_llm_timed(self, prompt):
+        """(response, seconds, tokens, stream timings or None)."""
+        return run_sync(self.query_llm_async_timed(prompt))
 
-        print("Error: Exceeded max retries due to rate limits.")
-        return None, None, None
+    def query_llm(self, prompt):
+        return self.query_llm_timed(prompt)[:3]
 
     def solve_puzzle(self, prompt):
         return self.query_llm(prompt)
@@ -1,41 +1,87 @@
-from openai import OpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 import time
 import os
 import json
+import logging
 from dotenv import load_dotenv
+from src.async_runner import HTTP_LIMITS, HTTP_TIMEOUT, run_sync
+from src.rate_limiter import get_limiter
+from src.response_cache import cached_query
+from src.streaming import StreamCollector, read_openai_stream
 
 load_dotenv()
+log = logging.getLogger(__name__)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+async_client = AsyncOpenAI(api_key=OPENAI_API_KEY,
+                           timeout=HTTP_TIMEOUT, max_retries=0,
+                           http_client=DefaultAsyncHttpxClient(limits=HTTP_LIMITS))
+SYSTEM_MESSAGE = "You are an expert puzzle solver. Output only valid JSON with no extra commentary."
 
 class OpenAISolver:
     def __init__(self):
         self.model = "gpt-4o"
+        self.temperature = None
+        # Optional ResponseCache, set by main.py when --cache is used.
+        self.cache = None
+        # Stream completions and stop reading once the JSON answer is complete (--stream).
+        self.stream = False
+        # Client for Batch API jobs (src/batch_api.py).
+        self.batch_client = async_client
 
-    def query_llm(self, prompt):
+    async def query_llm_async(self, prompt):
+        """(response, seconds, tokens), like query_llm."""
+        return (await self.query_llm_async_timed(prompt))[:3]
+
+    async def query_llm_async_timed(self, prompt):
+        """(response, seconds, tokens, stream timings or None)."""
+        return await cached_query(self.cache, "openai", self.model, SYSTEM_MESSAGE, prompt,
+                                  self.temperature, self.fetch, self.stream)
+
+    async def fetch(self, prompt):
         start_time = time.time()
-        retries = 10
-        for attempt in range(retries):
-            try:
-                response = client.chat.completions.create(model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert puzzle solver. Output only valid JSON with no extra commentary."},
-                    {"role": "user", "content": prompt}
-                ],
-                )
-                # Debug
-                print(f"OpenAI API Response: {response}")
-                llm_response = response.choices[0].message.content
-                response_time = round(time.time() - start_time, 2)
-                token_usage = response.usage.total_tokens if hasattr(response, 'usage') and response.usage.total_tokens is not None else "N/A"
-                return llm_response, response_time, token_usage
-            except Exception as e:
-                print(f"OpenAI API error on attempt {attempt+1}: {e}")
-                wait_time = 2 ** attempt
-                print(f"Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
-        print("Error: Exceeded max retries for OpenAI API.")
-        return None, None, None
+        messages = [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}
+        ]
+
+        async def request():
+            if self.stream:
+                collector = StreamCollector(start_time)
+                stream = await async_client.chat.completions.create(
+                    model=self.model, messages=messages,
+                    stream=True, stream_options={"include_usage": True})
+                token_usage = await read_openai_stream(stream, collector)
+                return collector.text(), round(time.time() - start_time, 2), token_usage, collector.timings()
+
+            response = await async_client.chat.completions.create(model=self.model, messages=messages)
+            log.debug("OpenAI API response: %s", response)
+            llm_response = response.choices[0].message.content
+            response_time = round(time.time() - start_time, 2)
+            token_usage = response.usage.total_tokens if hasattr(response, 'usage') and response.usage.total_tokens is not None else "N/A"
+            return llm_response, response_time, token_usage, None
+
+        try:
+            return await get_limiter("openai").call(request)
+        except Exception as e:
+            log.error("OpenAI API request failed: %s", e)
+            return None, None, None, None
+
+    def batch_request(self, custom_id, prompt):
+        """One line of a Batch API input file: the same request fetch() would send."""
+        body = {"model": self.model, "messages": [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}
+        ]}
+        if self.temperature is not None:
+            body["temperature"] = self.temperature
+        return {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}
+
+    def query_llm_timed(self, prompt):
+        """(response, seconds, tokens, stream timings or None)."""
+        return run_sync(self.query_llm_async_timed(prompt))
+
+    def query_llm(self, prompt):
+        return self.query_llm_timed(prompt)[:3]
 
     def solve_puzzle(self, prompt):
         return self.query_llm(prompt)
@@ -47,7 +93,7 @@ class OpenAISolver:
                 parsed_json = json.loads(llm_response)
                 return parsed_json, response_time, token_usage
             except json.JSONDecodeError:
-                print("Error: Could not parse OpenAI's Z3 conversion response as JSON.")
+                log.warning("Could not parse OpenAI's Z3 conversion response as JSON.")
                 return "Error: Could not parse OpenAI's Z3 conversion.", response_time, token_usage
         else:
             return None, response_time, token_usage
@@ -0,0 +1,331 @@
+import json
+import logging
+import time
+from concurrent.futures import Future
+from src.deepseek_solver import DeepSeekSolver
+from src.json_extract import extract_json
+from src.mistral_solver import MistralSolver
+from src.openai_solver import OpenAISolver
+from src.prompt_generator import get_prompt
+from src.propagation_solver import PropagationSolver, PropagationIncomplete
+from src.z3_solver import ZebraSolver
+
+log = logging.getLogger(__name__)
+SOLVERS = {"mistral": MistralSolver, "openai": OpenAISolver, "deepseek": DeepSeekSolver}
+
+def clean_response(text):
+    """The first JSON object in an LLM answer, repaired into valid JSON; the stripped text if there is none."""
+    if not isinstance(text, str):
+        text = str(text)
+    extracted = extract_json(text)
+    return extracted if extracted is not None else text.strip()
+
+def record_stream_timings(result, timings):
+    """Copies time to first token / to complete JSON from a streamed response (None otherwise)."""
+    if timings:
+        result["first_token_time"] = timings["first_token_time"] if timings["first_token_time"] is not None else "N/A"
+        result["json_time"] = timings["json_complete_time"] if timings["json_complete_time"] is not None else "N/A"
+
+def run_solve(llm_solver, text_description, strategy):
+    prompt_solve = get_prompt("solve", strategy) + "\n" + text_description
+    return solve_result(strategy, *llm_solver.query_llm_timed(prompt_solve))
+
+def solve_result(strategy, llm_sol_text, rtime, tokens, timings=None):
+    """Turns a solve response (from query_llm_timed or a batch job) into the fields finish_puzzle logs."""
+    result = {
+        "solve_dict_str": "N/A",
+        "solve_time": 0,
+        "solve_tokens": "N/A",
+        "chain_of_thought": "N/A",
+        "first_token_time": "N/A",
+        "json_time": "N/A",
+        "error_msg": None
+    }
+
+    record_stream_timings(result, timings)
+    if llm_sol_text:
+        cleaned_text = clean_response(llm_sol_text)
+        result["solve_dict_str"] = cleaned_text
+        result["solve_time"] = rtime
+        result["solve_tokens"] = tokens
+        log.debug("Cleaned response for solve: %s", cleaned_text)
+        log.debug("LLM dictionary solution:\n%s", llm_sol_text)
+        if strategy == "cot":
+            try:
+                sol_obj = json.loads(cleaned_text)
+                result["chain_of_thought"] = sol_obj.get("explanation", "N/A")
+                if "solution" in sol_obj:
+                    # keeping it for logging
+                    result["solve_dict_str"] = json.dumps(sol_obj["solution"])
+            except Exception as e:
+                log.warning("Error parsing CoT response for puzzle solve: %s", e)
+    else:
+        log.warning("No LLM puzzle solution or error from API.")
+        result["error_msg"] = "LLM puzzle solution is None (API error or rate limit)."
+    return result
+
+def run_convert(llm_solver, text_description, strategy):
+    prompt_convert = get_prompt("convert", strategy) + "\n" + text_description
+    return convert_result(strategy, *llm_solver.query_llm_timed(prompt_convert))
+
+def convert_result(strategy, llm_constraints_str, conv_time, conv_tokens, timings=None):
+    """Same as solve_result for a convert response."""
+    result = {
+        "convert_constraints": "N/A",
+        "convert_time": 0,
+        "convert_tokens": "N/A",
+        "chain_of_thought": "N/A",
+        "first_token_time": "N/A",
+        "json_time": "N/A",
+        "error_msg": None
+    }
+
+    record_stream_timings(result, timings)
+    if llm_constraints_str:
+        result["convert_time"] = conv_time
+        result["convert_tokens"] = conv_tokens
+        cleaned_constraints = clean_response(llm_constraints_str)
+        if strategy == "cot":
+            try:
+                constraints_obj = json.loads(cleaned_constraints)
+                result["chain_of_thought"] = constraints_obj.get("explanation", "N/A")
+                z3_obj = constraints_obj.get("z3", {})
+                result["convert_constraints"] = json.dumps(z3_obj)
+            except Exception as e:
+                log.warning("Error parsing CoT convert response: %s", e)
+                # fallback
+                result["convert_constraints"] = cleaned_constraints
+        else:
+            # baseline or multishot: 
+            result["convert_constraints"] = cleaned_constraints
+    else:
+        log.warning("No valid LLM constraints or error from API.")
+        result["error_msg"] = "LLM constraints is None (API error)."
+    return result
+
+def try_propagation(llm_constraints_json, solution_limit):
+    """
+    Fast path: (solution, count) from the propagation solver, or None when the
+    puzzle is UNSAT or needs Z3 (UNSAT goes to Z3 too, for the diagnosis).
+    """
+    try:
+        solutions = PropagationSolver(llm_constraints_json).enumerate_solutions(max(solution_limit, 1))
+    except PropagationIncomplete as e:
+        log.debug("Propagation solver cannot finish (%s); using Z3.", e)
+        return None
+    if not solutions:
+        return None
+    return solutions[0], (len(solutions) if solution_limit > 0 else "N/A")
+
+def check_constraints(convert_constraints, encoding="int", solution_limit=2, backend="auto",
+                      timeout=None, max_memory=None, unsat_core=False):
+    """
+    Feeds the LLM-generated constraints to the solvers. Kept separate from run_convert
+    because the Z3 context is not thread-safe, so this always runs on the main thread.
+
+    solver_status is "sat", "unsat", "unknown" (Z3 hit the timeout or memory limit)
+    or "error"; solver_time is the wall time spent solving, apart from LLM latency.
+    With unsat_core=True an UNSAT conversion gets a minimal unsat core (the original
+    constraint objects and their indices) instead of the slower diagnose() report.
+    """
+    result = {
+        "convert_solver_str": "N/A",
+        "solution_count": "N/A",
+        "solver_status": "error",
+        "solver_time": 0,
+        "unsat_core": "N/A",
+        "error_msg": None
+    }
+    start = time.perf_counter()
+    try:
+        # Parse the final constraints to solver
+        llm_constraints_json = json.loads(convert_constraints)
+        log.debug("LLM-generated Z3 constraints:\n%s", llm_constraints_json)
+        fast_result = try_propagation(llm_constraints_json, solution_limit) if backend == "auto" else None
+        if fast_result is not None:
+            solver_result, result["solution_count"] = fast_result
+            log.debug("Propagation solver result from LLM constraints: %s", solver_result)
+            result["convert_solver_str"] = json.dumps(solver_result)
+            result["solver_status"] = "sat"
+        else:
+            try:
+                solver_llm = ZebraSolver(llm_constraints_json, incremental=True, encoding=encoding,
+                                         timeout=timeout, max_memory=max_memory)
+                solver_result = solver_llm.solve()
+                if solver_llm.status is not None:
+                    result["solver_status"] = solver_llm.status
+                if solver_result:
+                    result["convert_solver_str"] = json.dumps(solver_result)
+                    log.debug("Z3 solver result from LLM constraints: %s", solver_result)
+                    if solution_limit > 0:
+                        # Counting starts from the model solve() already found.
+                        solution_count = solver_llm.count_solutions(solution_limit, first=solver_result)
+                        if solution_count is None:
+                            result["solution_count"] = "unknown"
+                            result["error_msg"] = (f"Z3 solver gave up counting solutions of LLM constraints: "
+                                                   f"{solver_llm.reason_unknown}.")
+                        else:
+                            result["solution_count"] = solution_count
+                            log.info("LLM constraints admit %s%s solution(s).", solution_count,
+                                     "+" if solution_count >= solution_limit else "")
+                elif solver_llm.status == "unknown":
+                    result["error_msg"] = f"Z3 solver gave up on LLM constraints: {solver_llm.reason_unknown}."
+                else:
+                    log.info("No solver result or puzzle unsatisfiable from LLM constraints.")
+                    error_msg = "Z3 solver returned no solution for LLM constraints."
+                    if not solver_llm.errors and unsat_core:
+                        core = solver_llm.unsat_core()
+                        if core is not None:
+                            result["unsat_core"] = [{"index": i, "constraint": solver_llm.constraints[i]} for i in core]
+                            result["solution_count"] = 0
+                            if core:
+                                error_msg += f" Unsat core: {json.dumps([solver_llm.constraints[i] for i in core])}"
+                            else:
+                                error_msg += " Base distinct/range encoding is already unsatisfiable."
+                    elif not solver_llm.errors:
+                        # Same solver, no rebuild: find the constraints that made it UNSAT.
+                        report = solver_llm.diagnose()
+                        conflicting = [solver_llm.constraints[i] for i in report["conflicting"]]
+                        if report["base_status"] != "sat":
+                            error_msg += " Base distinct/range encoding is already unsatisfiable."
+                        elif conflicting:
+                            error_msg += f" Conflicting constraints: {json.dumps(conflicting)}"
+                        result["solution_count"] = 0
+                    result["error_msg"] = error_msg
+            except Exception as e:
+                result["error_msg"] = f"Error feeding LLM constraints to solver: {str(e)}"
+    except Exception as e:
+        log.warning("Could not parse LLM constraints as JSON: %s", e)
+        result["error_msg"] = f"Error parsing LLM constraints: {str(e)}"
+    result["solver_time"] = round(time.perf_counter() - start, 4)
+    return result
+
+def get_variant(action):
+    do_solve = (action in ["solve", "both"])
+    do_convert = (action in ["convert", "both"])
+
+    if do_solve and do_convert:
+        return "full_test"
+    elif do_solve:
+        return "solve"
+    elif do_convert:
+        return "convert"
+    return "unknown"
+
+def submit_puzzle(executor, llm_solver, puzzle_data, action, strategy):
+    """
+    Queues the LLM requests for one puzzle. Solve and convert are independent,
+    so with a pool they run side by side.
+    """
+    text_description = puzzle_data["text_description"]
+    futures = {}
+    if action in ["solve", "both"]:
+        futures["solve"] = executor.submit(run_solve, llm_solver, text_description, strategy)
+    if action in ["convert", "both"]:
+        futures["convert"] = executor.submit(run_convert, llm_solver, text_description, strategy)
+    return futures
+
+def finish_puzzle(logger, llm_provider, puzzle_name, puzzle_data, action, strategy, futures,
+                  solver_options=None):
+    """solver_options are passed through to check_constraints (encoding, solution_limit, backend, limits)."""
+    solver_options = solver_options or {}
+    solution_limit = solver_options.get("solution_limit", 2)
+    text_description = puzzle_data["text_description"]
+    puzzle_z3 = puzzle_data.get("z3_format", None)
+    puzzle_ground_truth_dict = puzzle_data["ground_truth_dict"]
+    puzzle_size = puzzle_data["size"]
+
+    log.info("Processing puzzle: %s", puzzle_name)
+
+    solve_dict_str = "N/A"
+    solve_time = 0
+    solve_tokens = "N/A"
+    solve_first_token_time = "N/A"
+    solve_json_time = "N/A"
+
+    convert_constraints = "N/A"
+    convert_solver_str = "N/A"
+    convert_time = 0
+    convert_tokens = "N/A"
+    solution_count = "N/A"
+    solver_status = "N/A"
+    solver_time = "N/A"
+    unsat_core = "N/A"
+    convert_first_token_time = "N/A"
+    convert_json_time = "N/A"
+
+    error_msg = None
+    chain_of_thought_solve = "N/A"
+    chain_of_thought_convert = "N/A"
+
+    if "solve" in futures:
+        solve_result = futures["solve"].result()
+        solve_dict_str = solve_result["solve_dict_str"]
+        solve_time = solve_result["solve_time"]
+        solve_tokens = solve_result["solve_tokens"]
+        solve_first_token_time = solve_result["first_token_time"]
+        solve_json_time = solve_result["json_time"]
+        chain_of_thought_solve = solve_result["chain_of_thought"]
+        error_msg = solve_result["error_msg"]
+
+    if "convert" in futures:
+        convert_result = futures["convert"].result()
+        convert_constraints = convert_result["convert_constraints"]
+        convert_time = convert_result["convert_time"]
+        convert_tokens = convert_result["convert_tokens"]
+        convert_first_token_time = convert_result["first_token_time"]
+        convert_json_time = convert_result["json_time"]
+        chain_of_thought_convert = convert_result["chain_of_thought"]
+        error_msg = error_msg or convert_result["error_msg"]
+        if convert_constraints != "N/A":
+            check_result = check_constraints(convert_constraints, **solver_options)
+            convert_solver_str = check_result["convert_solver_str"]
+            solution_count = check_result["solution_count"]
+            solver_status = check_result["solver_status"]
+            solver_time = check_result["solver_time"]
+            unsat_core = check_result["unsat_core"]
+            error_msg = error_msg or check_result["error_msg"]
+
+    log.debug("Chain of thought: %s%s", chain_of_thought_solve, chain_of_thought_convert)
+    combined_chain_of_thought = "Solve: " + chain_of_thought_solve + "; Convert: " + chain_of_thought_convert
+
+    logger.log_run(
+        llm_provider=llm_provider,
+        puzzle_name=puzzle_name,
+        puzzle_size=puzzle_size,
+        variant=get_variant(action),
+        strategy=strategy,
+        chain_of_thought=combined_chain_of_thought,
+        prompt=text_description,
+        puzzle_ground_truth_dict=puzzle_ground_truth_dict,
+        solve_dict_str=solve_dict_str,
+        solve_time=solve_time,
+        solve_tokens=solve_tokens,
+        convert_constraints=convert_constraints,
+        convert_solver_str=convert_solver_str,
+        convert_time=convert_time,
+        convert_tokens=convert_tokens,
+        puzzle_z3=puzzle_z3,
+        error_msg=error_msg,
+        convert_solution_count=solution_count,
+        convert_solution_limit=solution_limit if solution_count != "N/A" else "N/A",
+        convert_solver_status=solver_status,
+        convert_solver_time=solver_time,
+        convert_unsat_core=unsat_core,
+        solve_first_token_time=solve_first_token_time,
+        solve_json_time=solve_json_time,
+        convert_first_token_time=convert_first_token_time,
+        convert_json_time=convert_json_time
+    )
+
+    log.info("Done with puzzle: %s", puzzle_name)
+
+class InlineExecutor:
+    """Runs submitted calls immediately, so the sequential path shares the pool code."""
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
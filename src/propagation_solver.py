@@ -0,0 +1,266 @@
+import numpy as np
+
+# Search nodes allowed before giving up and leaving the puzzle to Z3.
+DEFAULT_NODE_LIMIT = 20000
+
+class PropagationIncomplete(Exception):
+    """The puzzle uses something this backend does not model; Z3 has to handle it."""
+
+def relation_matrix(houses, relation):
+    """M[i, j] is True when (houses[i], houses[j]) satisfies the relation."""
+    h = np.asarray(houses)
+    return relation(h[:, None], h[None, :])
+
+class PropagationSolver:
+    """
+    Pure NumPy fast path for the same puzzle JSON as ZebraSolver (Int encoding
+    semantics). Candidate houses live in a boolean tensor of shape [item, house];
+    every binary constraint becomes a [house, house] relation matrix and is kept
+    arc-consistent, distinct categories get singleton and hidden-single
+    elimination, and a small backtracking search finishes the job.
+
+    status ends up "sat", "unsat" or "unknown". "unknown" means the puzzle needs
+    Z3: an unsupported constraint, malformed input, no range constraint (Int
+    positions would be unbounded) or the node limit was hit.
+    """
+    def __init__(self, puzzle, node_limit=DEFAULT_NODE_LIMIT):
+        self.puzzle = puzzle
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.status = "unknown"
+        self.reason = None
+
+        self.items = []
+        self.index = {}
+        self.houses = []
+        self.initial = None
+        self.groups = []        # index arrays of items that must be pairwise distinct
+        self.binary = []        # (x, y, relation matrix)
+
+    def compile(self):
+        """
+        Builds the initial domain and relation matrices. JSON of the wrong shape
+        (constraints that are not objects, non-string names) raises
+        PropagationIncomplete like anything else this backend cannot handle, so
+        the caller falls back to Z3 and its validation.
+        """
+        try:
+            # ZebraSolver requires it too, so both paths accept the same puzzles.
+            if "houses_count" not in self.puzzle:
+                raise PropagationIncomplete("malformed puzzle: no houses_count")
+            categories = self.puzzle["categories"]
+            constraints = self.puzzle["constraints"]
+            for items in categories.values():
+                for item in items:
+                    if not isinstance(item, str):
+                        raise PropagationIncomplete(f"malformed puzzle: non-string item {item!r}")
+                    if item not in self.index:
+                        self.index[item] = len(self.items)
+                        self.items.append(item)
+        except (KeyError, TypeError, AttributeError) as e:
+            raise PropagationIncomplete(f"malformed puzzle: {e}")
+        if not isinstance(constraints, list) or not all(isinstance(c, dict) for c in constraints):
+            raise PropagationIncomplete("malformed puzzle: constraints must be a list of objects")
+
+        low, high = None, None
+        for c in constraints:
+            if c.get("type") == "range":
+                lo, hi = c.get("from"), c.get("to")
+                if not self.is_int(lo) or not self.is_int(hi):
+                    raise PropagationIncomplete(f"non-integer range: {c}")
+                low = lo if low is None else max(low, lo)
+                high = hi if high is None else min(high, hi)
+        if low is None:
+            raise PropagationIncomplete("no range constraint")
+        self.houses = list(range(low, high + 1))
+        domain = np.ones((len(self.items), len(self.houses)), dtype=bool)
+
+        for c in constraints:
+            ctype = c.get("type")
+            if ctype == "range":
+                continue
+            if ctype == "distinct_categories":
+                cat_list = c.get("categories")
+                if not isinstance(cat_list, list):
+                    raise PropagationIncomplete(f"bad distinct_categories: {c}")
+                for cat_name in cat_list:
+                    if not isinstance(cat_name, str) or cat_name not in categories:
+                        raise PropagationIncomplete(f"unknown category: {cat_name}")
+                    group = [self.index[it] for it in categories[cat_name]]
+                    if len(set(group)) != len(group):
+                        raise PropagationIncomplete(f"repeated item in category: {cat_name}")
+                    self.groups.append(np.array(group))
+                continue
+            self.compile_constraint(c, domain)
+
+        self.initial = domain
+
+    def is_int(self, value):
+        return isinstance(value, int) and not isinstance(value, bool)
+
+    def var(self, c, key):
+        name = c.get(key)
+        if not isinstance(name, str) or name not in self.index:
+            raise PropagationIncomplete(f"unknown {key}: {c}")
+        return self.index[name]
+
+    def number(self, c, key):
+        value = c.get(key)
+        if not self.is_int(value):
+            raise PropagationIncomplete(f"non-integer {key}: {c}")
+        return value
+
+    def compile_constraint(self, c, domain):
+        ctype = c.get("type")
+        houses = np.asarray(self.houses)
+        if ctype == "eq" and "var2int" in c:
+            domain[self.var(c, "var1")] &= houses == self.number(c, "var2int")
+            return
+        if ctype == "neq":
+            domain[self.var(c, "var1")] &= houses != self.number(c, "var2int")
+            return
+
+        if ctype == "eq":
+            relation = lambda a, b: a == b
+        elif ctype == "eq_offset":
+            k = self.number(c, "offset")
+            relation = lambda a, b: a == b + k
+        elif ctype == "neighbor":
+            relation = lambda a, b: np.abs(a - b) == 1
+        elif ctype == "not_neighbor":
+            relation = lambda a, b: np.abs(a - b) != 1
+        elif ctype == "ImmediateLeft":
+            relation = lambda a, b: a == b - 1
+        elif ctype == "ImmediateRight":
+            relation = lambda a, b: a == b + 1
+        elif ctype == "rightOf":
+            relation = lambda a, b: a > b
+        elif ctype == "leftOf":
+            relation = lambda a, b: a < b
+        elif ctype == "abs_diff":
+            d = self.number(c, "diff")
+            relation = lambda a, b: np.abs(a - b) == d
+        else:
+            raise PropagationIncomplete(f"unsupported constraint type: {ctype}")
+
+        x, y = self.var(c, "var1"), self.var(c, "var2")
+        matrix = relation_matrix(self.houses, relation)
+        if x == y:
+            # Same item on both sides: only the diagonal of the relation applies.
+            domain[x] &= np.diagonal(matrix)
+        else:
+            self.binary.append((x, y, matrix))
+
+    def propagate(self, domain):
+        """Narrows domain in place to a fixpoint. Returns False on a wipe-out."""
+        n_houses = len(self.houses)
+        changed = True
+        while changed:
+            changed = False
+            for x, y, matrix in self.binary:
+                new_x = domain[x] & matrix[:, domain[y]].any(axis=1)
+                new_y = domain[y] & matrix[domain[x], :].any(axis=0)
+                if not new_x.any() or not new_y.any():
+                    return False
+                if (new_x != domain[x]).any() or (new_y != domain[y]).any():
+                    domain[x] = new_x
+                    domain[y] = new_y
+                    changed = True
+
+            for group in self.groups:
+                sub = domain[group]
+                sizes = sub.sum(axis=1)
+                if (sizes == 0).any():
+                    return False
+                # Values fixed for one item are removed from the others.
+                fixed = sizes == 1
+                if fixed.any():
+                    taken = sub[fixed].sum(axis=0)
+                    if (taken > 1).any():
+                        return False
+                    pruned = np.where(fixed[:, None], sub, sub & ~(taken > 0))
+                    if (pruned != sub).any():
+                        domain[group] = pruned
+                        sub = pruned
+                        changed = True
+                if not sub.any(axis=1).all():
+                    return False
+                if len(group) > n_houses or sub.any(axis=0).sum() < len(group):
+                    return False
+                # Hidden single: with as many items as houses, each house is used exactly once.
+                if len(group) == n_houses:
+                    support = sub.sum(axis=0)
+                    if (support == 0).any():
+                        return False
+                    singles = np.flatnonzero(support == 1)
+                    owners = sub[:, singles].argmax(axis=0)
+                    if len(set(owners.tolist())) != len(owners):
+                        # One item is the only candidate for two houses.
+                        return False
+                    for owner, h in zip(owners, singles):
+                        if sub[owner].sum() > 1:
+                            row = np.zeros(n_houses, dtype=bool)
+                            row[h] = True
+                            domain[group[owner]] = row
+                            changed = True
+        return True
+
+    def search(self, domain, limit, solutions):
+        self.nodes += 1
+        if self.nodes > self.node_limit:
+            raise PropagationIncomplete("node limit reached")
+        if not self.propagate(domain):
+            return
+        sizes = domain.sum(axis=1)
+        if (sizes == 1).all():
+            if self.is_solution(domain):
+                solutions.append(domain.argmax(axis=1))
+            return
+        # Branch on the most constrained open item.
+        open_sizes = np.where(sizes > 1, sizes, np.iinfo(sizes.dtype).max)
+        item = int(open_sizes.argmin())
+        for h in np.flatnonzero(domain[item]):
+            child = domain.copy()
+            child[item] = False
+            child[item, h] = True
+            self.search(child, limit, solutions)
+            if len(solutions) >= limit:
+                return
+
+    def is_solution(self, domain):
+        pos = domain.argmax(axis=1)
+        for x, y, matrix in self.binary:
+            if not matrix[pos[x], pos[y]]:
+                return False
+        for group in self.groups:
+            if len(set(pos[group].tolist())) != len(group):
+                return False
+        return True
+
+    def enumerate_solutions(self, limit=10):
+        """Up to `limit` solutions as {item: house}. Raises PropagationIncomplete if Z3 is needed."""
+        if self.initial is None:
+            self.compile()
+        self.nodes = 0
+        found = []
+        self.search(self.initial.copy(), limit, found)
+        return [{item: self.houses[h] for item, h in zip(self.items, pos)} for pos in found]
+
+    def solve(self):
+        """First solution, or None. Check self.status: None with status 'unknown' means ask Z3."""
+        try:
+            solutions = self.enumerate_solutions(1)
+        except PropagationIncomplete as e:
+            self.status = "unknown"
+            self.reason = str(e)
+            return None
+        self.status = "sat" if solutions else "unsat"
+        return solutions[0] if solutions else None
+
+    def count_solutions(self, limit=2):
+        """Solutions capped at limit, or None if propagation cannot finish."""
+        try:
+            return len(self.enumerate_solutions(limit))
+        except PropagationIncomplete as e:
+            self.reason = str(e)
+            return None
@@ -0,0 +1,55 @@
+import math
+
+class QuantileSketch:
+    """
+    Streaming quantile sketch with log-spaced buckets (the DDSketch idea).
+    Every reported quantile is within `relative_accuracy` of the true value, and
+    memory depends on the spread of the values, not on how many were added.
+    Only positive values are tracked; latencies and token counts never go below zero.
+    """
+    def __init__(self, relative_accuracy=0.01):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        if value is None or value <= 0:
+            return
+        key = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        for key, n in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + n
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                # Midpoint of the bucket (gamma^(key-1), gamma^key], clamped to what was seen.
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self, quantiles=(0.5, 0.9, 0.99)):
+        out = {f"p{int(q * 100)}": self.quantile(q) for q in quantiles}
+        out["mean"] = self.total / self.count if self.count else None
+        out["count"] = self.count
+        return out
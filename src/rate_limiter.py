@@ -0,0 +1,168 @@
+import asyncio
+import email.utils
+import logging
+import random
+import time
+import httpx
+import openai
+
+log = logging.getLogger(__name__)
+
+# Starting request rate (per second) and in-flight cap per provider. The rate adapts
+# at run time: it grows while requests succeed and halves on every 429.
+PROVIDER_LIMITS = {
+    "openai": {"rate": 8.0, "max_concurrency": 32},
+    "deepseek": {"rate": 8.0, "max_concurrency": 32},
+    "mistral": {"rate": 1.0, "max_concurrency": 8},
+}
+MAX_RETRIES = 6
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+# HTTP statuses worth retrying; any other 4xx (bad request, auth, ...) fails at once.
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+class RateLimiter:
+    """
+    Client-side limiter shared by every request to one provider: a token bucket
+    whose rate follows AIMD (additive increase per success, multiplicative decrease
+    per 429), a cap on requests in flight, and a provider-wide pause when the server
+    sends Retry-After. Lives on the background event loop like the API clients.
+    """
+    def __init__(self, name, rate, max_concurrency=None, max_rate=None, min_rate=0.05,
+                 increase=0.05, decrease=0.5):
+        self.name = name
+        self.rate = rate
+        self.max_rate = max_rate or rate * 4
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+        self.slots = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+
+    async def acquire(self):
+        """Waits for a token; waiters are served in arrival order."""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                # Allow a burst of up to one second's worth of requests.
+                self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.requests += 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after=None):
+        self.throttled += 1
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.tokens = 0.0
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+    async def call(self, request, retries=MAX_RETRIES):
+        """
+        Runs await request() under the limiter, retrying transient failures with
+        jittered exponential backoff (or the server's Retry-After). Raises the last
+        error once retries run out, or at once for errors that retrying cannot fix.
+        """
+        for attempt in range(retries + 1):
+            try:
+                if self.slots is None:
+                    await self.acquire()
+                    result = await request()
+                else:
+                    async with self.slots:
+                        await self.acquire()
+                        result = await request()
+            except Exception as e:
+                retryable, status, retry_after = classify_error(e)
+                if status == 429:
+                    self.on_throttle(retry_after)
+                if not retryable or attempt == retries:
+                    self.failures += 1
+                    raise
+                wait_time = retry_after if retry_after is not None else backoff(attempt)
+                self.retries += 1
+                log.warning("%s API error on attempt %d (%s): %s. Retrying in %.1f seconds...",
+                            self.name, attempt + 1, status or type(e).__name__, e, wait_time)
+                await asyncio.sleep(wait_time)
+            else:
+                self.on_success()
+                return result
+
+    def stats(self):
+        return {"requests": self.requests, "throttled": self.throttled, "retries": self.retries,
+                "failures": self.failures, "rate": round(self.rate, 2)}
+
+def backoff(attempt):
+    """Full jitter: a random wait up to the exponential bound, so clients do not retry in lockstep."""
+    return random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt))
+
+def parse_retry_after(headers):
+    """Seconds to wait from retry-after-ms / Retry-After (seconds or HTTP date), or None."""
+    if headers is None:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def classify_error(error):
+    """(retryable, HTTP status or None, Retry-After seconds or None) for an API call error."""
+    response = getattr(error, "response", None)
+    if isinstance(error, openai.APIStatusError):
+        status = error.status_code
+    elif isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+    else:
+        # No HTTP response at all: network trouble and timeouts are worth another try.
+        retryable = isinstance(error, (openai.APIConnectionError, httpx.TransportError,
+                                       asyncio.TimeoutError, ConnectionError))
+        return retryable, None, None
+    retry_after = parse_retry_after(response.headers) if response is not None else None
+    return status in RETRYABLE_STATUS, status, retry_after
+
+_limiters = {}
+
+def configure_limiter(provider, rate=None, max_concurrency=None):
+    """Overrides the defaults for provider; call before its first request."""
+    limits = dict(PROVIDER_LIMITS.get(provider, {"rate": 1.0, "max_concurrency": 8}))
+    if rate:
+        limits["rate"] = rate
+    if max_concurrency:
+        limits["max_concurrency"] = max_concurrency
+    _limiters[provider] = RateLimiter(provider, **limits)
+    return _limiters[provider]
+
+def get_limiter(provider):
+    """The limiter shared by every solver instance talking to provider."""
+    if provider not in _limiters:
+        configure_limiter(provider)
+    return _limiters[provider]
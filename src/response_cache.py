@@ -0,0 +1,153 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from src.single_flight import in_flight
+
+log = logging.getLogger(__name__)
+
+CACHE_FILE = "results/llm_cache.sqlite"
+# How many writes between eviction sweeps.
+EVICT_EVERY = 50
+
+def cache_key(provider, model, system_message, prompt, temperature, stream=False):
+    """
+    stream=True marks responses read with early JSON termination (--stream): they
+    can stop after the answer object, so they never share a key with full replies.
+    Full replies keep the key they had before streaming existed.
+    """
+    request = {
+        "provider": provider,
+        "model": model,
+        "system": system_message,
+        "prompt": prompt,
+        "temperature": temperature
+    }
+    if stream:
+        request["stream"] = "early_stop"
+    payload = json.dumps(request, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Persistent LLM response cache in a single SQLite file, shared safely between
+    threads and processes. Entries older than max_age_days, or the least recently
+    used ones beyond max_mb, are evicted.
+
+    mode "on" reads and writes the cache; mode "only" never calls the API, so a
+    miss comes back as (None, None, None, None) like any other API failure.
+    """
+    def __init__(self, path=CACHE_FILE, mode="on", max_age_days=None, max_mb=None):
+        self.path = path
+        self.mode = mode
+        self.max_age_seconds = max_age_days * 86400 if max_age_days else None
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb else None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.lock = threading.Lock()
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                provider TEXT,
+                model TEXT,
+                response TEXT,
+                response_time REAL,
+                token_usage TEXT,
+                created REAL,
+                last_used REAL,
+                size INTEGER
+            )""")
+        self.conn.commit()
+        self.evict()
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response, response_time, token_usage, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or self.is_expired(row[3]):
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            self.hits += 1
+        response, response_time, token_usage, _ = row
+        return response, response_time, json.loads(token_usage)
+
+    def put(self, key, provider, model, response, response_time, token_usage):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, response, response_time, json.dumps(token_usage),
+                 now, now, len(response.encode("utf-8")))
+            )
+            self.conn.commit()
+            self.writes += 1
+        if self.writes % EVICT_EVERY == 0:
+            self.evict()
+
+    def is_expired(self, created):
+        return self.max_age_seconds is not None and created < time.time() - self.max_age_seconds
+
+    def evict(self):
+        with self.lock:
+            if self.max_age_seconds is not None:
+                self.conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.max_age_seconds,))
+            if self.max_bytes is not None:
+                total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                if total > self.max_bytes:
+                    rows = self.conn.execute("SELECT key, size FROM responses ORDER BY last_used ASC").fetchall()
+                    stale = []
+                    for key, size in rows:
+                        if total <= self.max_bytes:
+                            break
+                        stale.append((key,))
+                        total -= size
+                    self.conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+            self.conn.commit()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "writes": self.writes}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+async def cached_query(cache, provider, model, system_message, prompt, temperature, fetch, stream=False):
+    """
+    Looks the request up in the cache before calling fetch(prompt), and stores
+    successful responses. Returns (response, seconds, tokens, stream timings); the
+    timings are not cached, so a hit has None there. Identical requests already in
+    flight share one call (see single_flight.py), cache or not. Streamed and full
+    replies are kept apart in both (see cache_key).
+    """
+    key = cache_key(provider, model, system_message, prompt, temperature, stream)
+    return await in_flight.run(key, provider, lambda: fetch_through_cache(cache, key, provider, model, prompt, fetch))
+
+async def fetch_through_cache(cache, key, provider, model, prompt, fetch):
+    if cache is None:
+        return await fetch(prompt)
+
+    cached = cache.get(key)
+    if cached is not None:
+        log.debug("Cache hit for %s/%s.", provider, model)
+        return cached + (None,)
+    if cache.mode == "only":
+        log.info("Cache miss for %s/%s in cache-only mode; skipping the API call.", provider, model)
+        return None, None, None, None
+
+    llm_response, response_time, token_usage, timings = await fetch(prompt)
+    if llm_response:
+        cache.put(key, provider, model, llm_response, response_time, token_usage)
+    return llm_response, response_time, token_usage, timings
@@ -0,0 +1,36 @@
+import asyncio
+import logging
+from collections import Counter
+
+log = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Coalesces identical requests that are in flight at the same time: the first
+    caller for a key runs the call, later callers with the same key wait for it and
+    get the same result (or exception) instead of a network call of their own.
+    Counters are kept per provider. Lives on the background event loop.
+    """
+    def __init__(self):
+        self.in_flight = {}
+        self.calls = Counter()
+        self.coalesced = Counter()
+
+    async def run(self, key, provider, call):
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.coalesced[provider] += 1
+            log.debug("Coalesced an in-flight %s request.", provider)
+        else:
+            self.calls[provider] += 1
+            task = asyncio.ensure_future(call())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        # shield: a cancelled waiter must not cancel the call the others wait on.
+        return await asyncio.shield(task)
+
+    def stats(self, provider):
+        return {"calls": self.calls[provider], "saved_calls": self.coalesced[provider]}
+
+# Shared by every solver instance, so concurrent workers and strategies coalesce too.
+in_flight = SingleFlight()
@@ -0,0 +1,102 @@
+import json
+import time
+from src.json_extract import JSONExtractor
+
+# Top-level members that hold the actual answer in CoT replies. Once one of them is
+# fully read the rest of the stream (usually more explanation) is not needed.
+STOP_KEYS = ("solution", "z3")
+
+class StreamCollector:
+    """
+    Collects a streamed completion and decides when enough of it has arrived: as soon
+    as the first JSON object is complete, or one of stop_keys inside it is. Records
+    seconds from start_time to the first token (reasoning tokens included) and to
+    the complete JSON.
+    """
+    def __init__(self, start_time, stop_keys=STOP_KEYS):
+        self.start_time = start_time
+        self.stop_keys = stop_keys
+        self.parts = []
+        self.extractor = JSONExtractor()
+        self.watching = True
+        self.early_text = None
+        self.first_token_time = None
+        self.json_complete_time = None
+
+    def elapsed(self):
+        return round(time.time() - self.start_time, 2)
+
+    def add_reasoning(self, text):
+        """Reasoning tokens (DeepSeek reasoner) only count towards time to first token."""
+        if text and self.first_token_time is None:
+            self.first_token_time = self.elapsed()
+
+    def add(self, text):
+        """Adds content; returns True once the caller can stop reading."""
+        if not text:
+            return False
+        if self.first_token_time is None:
+            self.first_token_time = self.elapsed()
+        self.parts.append(text)
+        if not self.watching:
+            return False
+        extractor = self.extractor
+        extractor.feed(text)
+        if not extractor.done and not any(key in extractor.completed_keys for key in self.stop_keys):
+            return False
+        snapshot = extractor.snapshot()
+        try:
+            json.loads(snapshot)
+        except (TypeError, ValueError):
+            # The repairs guessed wrong somewhere; read everything and let clean_response decide.
+            self.watching = False
+            return False
+        self.early_text = snapshot
+        self.json_complete_time = self.elapsed()
+        return True
+
+    def text(self):
+        """The JSON read so far if the stream was cut short, otherwise the full reply."""
+        return self.early_text if self.early_text is not None else "".join(self.parts)
+
+    def timings(self):
+        return {"first_token_time": self.first_token_time, "json_complete_time": self.json_complete_time}
+
+async def read_openai_stream(stream, collector):
+    """
+    Feeds an OpenAI-compatible chat completion stream into collector and closes it
+    early once the JSON is complete. Returns total tokens, which only arrive with
+    the final chunk ("N/A" when the stream was cut short).
+    """
+    token_usage = "N/A"
+    try:
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None and chunk.usage.total_tokens is not None:
+                token_usage = chunk.usage.total_tokens
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            collector.add_reasoning(getattr(delta, "reasoning_content", None))
+            if collector.add(delta.content):
+                break
+    finally:
+        await stream.close()
+    return token_usage
+
+async def read_sse_stream(response, collector):
+    """Same as read_openai_stream for a raw httpx server-sent-events response (Mistral)."""
+    token_usage = "N/A"
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            break
+        chunk = json.loads(payload)
+        usage = chunk.get("usage") or {}
+        if usage.get("total_tokens") is not None:
+            token_usage = usage["total_tokens"]
+        choices = chunk.get("choices") or []
+        if choices and collector.add(choices[0].get("delta", {}).get("content")):
+            break
+    return token_usage
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from src.benchmark import get_difficulty
+from src.log_config import LOG_LEVELS, configure_logging
+from src.logger import Logger
+from src.pipeline import SOLVERS, InlineExecutor, finish_puzzle, get_variant, submit_puzzle
+from src.rate_limiter import PROVIDER_LIMITS, configure_limiter, get_limiter
+from src.response_cache import ResponseCache, CACHE_FILE
+from src.single_flight import in_flight
+
+log = logging.getLogger(__name__)
+
+SWEEP_DIR = "results/sweep"
+STRATEGIES = ["baseline", "cot", "multishot"]
+
+def select_puzzles(puzzles, patterns=None, sizes=None, difficulties=None):
+    """Puzzles matching every given filter: name glob patterns, sizes ("3x3") and difficulty levels."""
+    selected = {}
+    for name, data in puzzles.items():
+        if patterns and not any(fnmatch.fnmatchcase(name, p) for p in patterns):
+            continue
+        if sizes and data["size"] not in sizes:
+            continue
+        if difficulties and get_difficulty(data["size"]) not in difficulties:
+            continue
+        selected[name] = data
+    return selected
+
+def cell_log_file(out_dir, llm, strategy, action, fmt="json"):
+    variant = "" if action == "both" else f"-{action}"
+    return os.path.join(out_dir, f"{llm}-{strategy}{variant}.{fmt}")
+
+def query_puzzle(llm_solver, puzzle_data, action, strategy):
+    """All LLM requests for one puzzle, run in a pool thread; returns the resolved futures."""
+    return submit_puzzle(InlineExecutor(), llm_solver, puzzle_data, action, strategy)
+
+def run_sweep(llms, strategies, puzzles, action="both", out_dir=SWEEP_DIR, fmt="json", workers=None,
+              provider_limits=None, solver_options=None, resume=False, stream=False, cache=None):
+    """
+    Runs every (llm, strategy) cell over puzzles on one shared thread pool and
+    writes one log per cell. A provider never has more than its limit of puzzles
+    in flight, so a slow or throttled provider cannot tie up the whole pool. LLM
+    requests run in the pool; Z3 checks and logging stay on this thread. Returns
+    the number of puzzles run per cell.
+    """
+    limits = {llm: (provider_limits or {}).get(llm) or PROVIDER_LIMITS[llm]["max_concurrency"] for llm in llms}
+    variant = get_variant(action)
+    solvers = {}
+    for llm in llms:
+        solvers[llm] = SOLVERS[llm]()
+        solvers[llm].stream = stream
+        solvers[llm].cache = cache
+        configure_limiter(llm, max_concurrency=limits[llm])
+
+    loggers, queues = {}, {llm: deque() for llm in llms}
+    for llm in llms:
+        for strategy in strategies:
+            logger = Logger(cell_log_file(out_dir, llm, strategy, action, fmt))
+            loggers[llm, strategy] = logger
+            done = logger.completed_cells() if resume else set()
+            for name, data in puzzles.items():
+                if (name, llm, strategy, variant) not in done:
+                    queues[llm].append((strategy, name, data))
+    total = sum(len(q) for q in queues.values())
+    log.info("Sweep: %d cells, %d puzzle runs, limits %s", len(loggers), total, limits)
+
+    counts = Counter()
+    running = {}
+    busy = Counter()
+    with ThreadPoolExecutor(max_workers=workers or sum(limits.values())) as executor:
+        def fill():
+            for llm, queue in queues.items():
+                while queue and busy[llm] < limits[llm]:
+                    strategy, name, data = queue.popleft()
+                    future = executor.submit(query_puzzle, solvers[llm], data, action, strategy)
+                    running[future] = (llm, strategy, name, data)
+                    busy[llm] += 1
+
+        fill()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                llm, strategy, name, data = running.pop(future)
+                busy[llm] -= 1
+                finish_puzzle(loggers[llm, strategy], llm, name, data, action, strategy, future.result(),
+                              solver_options)
+                counts[llm, strategy] += 1
+            fill()
+            log.info("Sweep progress: %d/%d", sum(counts.values()), total)
+
+    for logger in loggers.values():
+        logger.close()
+    return counts
+
+def parse_limits(values):
+    """["openai=16", "mistral=2"] -> {"openai": 16, "mistral": 2}"""
+    limits = {}
+    for value in values or []:
+        llm, _, n = value.partition("=")
+        if llm not in SOLVERS or not n.isdigit() or int(n) < 1:
+            raise argparse.ArgumentTypeError(f"Bad --limit '{value}'; expected <llm>=<positive int>.")
+        limits[llm] = int(n)
+    return limits
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run providers x strategies x puzzles in one invocation, one result file per cell.")
+    parser.add_argument("--llm", nargs="+", choices=list(SOLVERS), default=list(SOLVERS))
+    parser.add_argument("--strategy", nargs="+", choices=STRATEGIES, default=STRATEGIES)
+    parser.add_argument("--action", choices=["solve", "convert", "both"], default="both")
+    parser.add_argument("--puzzle", nargs="+", default=None, help="Puzzle names or glob patterns (e.g. 'puzzle_1*').")
+    parser.add_argument("--size", nargs="+", default=None, help="Only these puzzle sizes (e.g. 3x3 4x4).")
+    parser.add_argument("--difficulty", nargs="+", choices=["Small", "Medium", "Large", "X-Large"], default=None)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Shared pool size. Default=sum of the per-provider limits.")
+    parser.add_argument("--limit", nargs="+", default=None, metavar="LLM=N",
+                        help="Puzzles in flight per provider (e.g. openai=16 mistral=2). Default=per-provider.")
+    parser.add_argument("--out-dir", default=SWEEP_DIR, help=f"One <llm>-<strategy> log per cell here. Default={SWEEP_DIR}.")
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json")
+    parser.add_argument("--resume", action="store_true", help="Skip puzzles a cell's log already has an answer for.")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--cache", choices=["off", "on", "only"], default="off")
+    parser.add_argument("--cache-file", default=CACHE_FILE)
+    parser.add_argument("--encoding", choices=["int", "bitvec", "onehot"], default="int")
+    parser.add_argument("--solver-backend", choices=["auto", "z3"], default="auto")
+    parser.add_argument("--solution-limit", type=int, default=2)
+    parser.add_argument("--solver-timeout", type=float, default=60)
+    parser.add_argument("--solver-max-memory", type=float, default=None)
+    parser.add_argument("--unsat-core", action="store_true")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default="INFO")
+    parser.add_argument("--quiet", action="store_true")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_logging(args.log_level, quiet=args.quiet)
+    try:
+        limits = parse_limits(args.limit)
+    except argparse.ArgumentTypeError as e:
+        log.error("%s", e)
+        sys.exit(1)
+    with open("data/puzzles.json", "r") as f:
+        puzzles = select_puzzles(json.load(f), args.puzzle, args.size, args.difficulty)
+    if not puzzles:
+        log.error("No puzzles match the filters.")
+        sys.exit(1)
+
+    cache = ResponseCache(args.cache_file, mode=args.cache) if args.cache != "off" else None
+    solver_options = {"encoding": args.encoding, "solution_limit": args.solution_limit,
+                      "backend": args.solver_backend, "timeout": args.solver_timeout,
+                      "max_memory": args.solver_max_memory, "unsat_core": args.unsat_core}
+    start = time.perf_counter()
+    counts = run_sweep(args.llm, args.strategy, puzzles, args.action, args.out_dir, args.format, args.workers,
+                       limits, solver_options, args.resume, args.stream, cache)
+    for (llm, strategy), n in sorted(counts.items()):
+        print(f"{cell_log_file(args.out_dir, llm, strategy, args.action, args.format)}: {n} puzzles")
+    for llm in args.llm:
+        print(f"{llm}: rate limiter {get_limiter(llm).stats()}, in-flight coalescing {in_flight.stats(llm)}")
+    if cache is not None:
+        print(f"Response cache stats: {cache.stats()}")
+        cache.close()
+    print(f"Sweep finished in {time.perf_counter() - start:.1f}s.")
@@ -0,0 +1,169 @@
+from z3 import (Abs, And, AtMost, BitVec, BitVecVal, Bool, BoolVal, Distinct, Implies, Int,
+                Not, Or, PbEq, ULE, ULT, is_true)
+
+class IntEncoding:
+    """
+    The original encoding: one unbounded Int per item, bounded only by the puzzle's
+    range constraint. Positions outside the range are possible if a puzzle has none.
+    """
+    name = "int"
+
+    def __init__(self, items, low, high, max_constant=0):
+        self.vars = {item: Int(item) for item in items}
+
+    def domain(self):
+        return []
+
+    def distinct(self, items):
+        return Distinct([self.vars[it] for it in items])
+
+    def range(self, low, high):
+        return And([And(v >= low, v <= high) for v in self.vars.values()])
+
+    def eq_int(self, x, value):
+        return self.vars[x] == value
+
+    def neq_int(self, x, value):
+        return self.vars[x] != value
+
+    def eq(self, x, y):
+        return self.vars[x] == self.vars[y]
+
+    def offset(self, x, y, k):
+        """x == y + k"""
+        return self.vars[x] == self.vars[y] + k
+
+    def lt(self, x, y):
+        return self.vars[x] < self.vars[y]
+
+    def neighbor(self, x, y):
+        return Or(self.vars[x] == self.vars[y] + 1, self.vars[x] == self.vars[y] - 1)
+
+    def abs_diff(self, x, y, diff):
+        return Abs(self.vars[x] - self.vars[y]) == diff
+
+    def value(self, model, x):
+        return model[self.vars[x]].as_long()
+
+    def has_value(self, x, value):
+        return self.vars[x] == value
+
+class BitVecEncoding(IntEncoding):
+    """
+    Small unsigned bit-vectors, always confined to the house domain. The width leaves
+    headroom above the largest position or constant so x == y + k never wraps into
+    the domain.
+    """
+    name = "bitvec"
+
+    def __init__(self, items, low, high, max_constant=0):
+        self.width = max(high, abs(max_constant), 1).bit_length() + 2
+        self.vars = {item: BitVec(item, self.width) for item in items}
+        self.low = low
+        self.high = high
+
+    def domain(self):
+        return [And(ULE(self.val(self.low), v), ULE(v, self.val(self.high))) for v in self.vars.values()]
+
+    def val(self, n):
+        return BitVecVal(n, self.width)
+
+    def in_domain(self, n):
+        return self.low <= n <= self.high
+
+    def range(self, low, high):
+        return And([And(ULE(self.val(low), v), ULE(v, self.val(high))) for v in self.vars.values()])
+
+    def eq_int(self, x, value):
+        if not self.in_domain(value):
+            return BoolVal(False)
+        return self.vars[x] == self.val(value)
+
+    def neq_int(self, x, value):
+        if not self.in_domain(value):
+            return BoolVal(True)
+        return self.vars[x] != self.val(value)
+
+    def offset(self, x, y, k):
+        if k >= 0:
+            return self.vars[x] == self.vars[y] + self.val(k)
+        return self.vars[y] == self.vars[x] + self.val(-k)
+
+    def lt(self, x, y):
+        return ULT(self.vars[x], self.vars[y])
+
+    def neighbor(self, x, y):
+        return self.abs_diff(x, y, 1)
+
+    def abs_diff(self, x, y, diff):
+        if diff < 0:
+            return BoolVal(False)
+        return Or(self.offset(x, y, diff), self.offset(y, x, diff))
+
+    def has_value(self, x, value):
+        return self.eq_int(x, value)
+
+class OneHotEncoding:
+    """
+    Boolean matrix b[item][house] with exactly-one per item and at-most-one per
+    house within each distinct category. Everything stays propositional, so Z3
+    solves the puzzle as pure SAT with cardinality constraints.
+    """
+    name = "onehot"
+
+    def __init__(self, items, low, high, max_constant=0):
+        self.houses = list(range(low, high + 1))
+        self.vars = {item: {h: Bool(f"{item}@{h}") for h in self.houses} for item in items}
+
+    def domain(self):
+        return [PbEq([(b, 1) for b in row.values()], 1) for row in self.vars.values()]
+
+    def cell(self, x, h):
+        return self.vars[x].get(h, BoolVal(False))
+
+    def distinct(self, items):
+        return And([AtMost(*[self.vars[it][h] for it in items], 1) for h in self.houses])
+
+    def range(self, low, high):
+        outside = [Not(b) for row in self.vars.values() for h, b in row.items() if not low <= h <= high]
+        return And(outside) if outside else BoolVal(True)
+
+    def eq_int(self, x, value):
+        return self.cell(x, value)
+
+    def neq_int(self, x, value):
+        return Not(self.cell(x, value))
+
+    def eq(self, x, y):
+        return And([self.vars[x][h] == self.vars[y][h] for h in self.houses])
+
+    def offset(self, x, y, k):
+        return And([self.vars[x][h] == self.cell(y, h - k) for h in self.houses])
+
+    def lt(self, x, y):
+        return And([Implies(self.vars[x][h], Or([self.cell(y, g) for g in self.houses if g > h]))
+                    for h in self.houses])
+
+    def neighbor(self, x, y):
+        return self.abs_diff(x, y, 1)
+
+    def abs_diff(self, x, y, diff):
+        if diff < 0:
+            return BoolVal(False)
+        return And([Implies(self.vars[x][h], Or(self.cell(y, h - diff), self.cell(y, h + diff)))
+                    for h in self.houses])
+
+    def value(self, model, x):
+        for h, b in self.vars[x].items():
+            if is_true(model.eval(b, model_completion=True)):
+                return h
+        return None
+
+    def has_value(self, x, value):
+        return self.cell(x, value)
+
+ENCODINGS = {
+    "int": IntEncoding,
+    "bitvec": BitVecEncoding,
+    "onehot": OneHotEncoding,
+}
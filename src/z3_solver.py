@@ -1,164 +1,359 @@
-from z3 import Solver, Distinct, Int, Or, sat, Abs
+from z3 import Solver, Z3Exception, sat, unsat, unknown, And, Bool, Implies, Not, Or
 import json
+import logging
+import time
+from src.z3_encodings import ENCODINGS
+
+log = logging.getLogger(__name__)
+
+def is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+class ConstraintType:
+    """
+    One entry in the constraint registry: the item and integer fields a constraint
+    needs, an optional extra check, and the encoder that turns a validated
+    constraint into a Z3 term. Base types are asserted unguarded even in
+    incremental mode.
+    """
+    def __init__(self, name, encode, items=(), numbers=(), check=None, base=False):
+        self.name = name
+        self.encode = encode
+        self.items = items
+        self.numbers = numbers
+        self.check = check
+        self.base = base
+
+    def validate(self, solver, c):
+        """Error message for an invalid constraint, or None."""
+        for key in self.items:
+            value = c.get(key)
+            if isinstance(value, (list, dict)) or value not in solver.item_vars:
+                return f"{self.name} referencing missing/unknown {key}: {c}"
+        for key in self.numbers:
+            if not is_int(c.get(key)):
+                return f"{self.name} missing or non-integer {key}: {c}"
+        if self.check:
+            return self.check(solver, c)
+        return None
+
+CONSTRAINT_TYPES = {}
+
+def register_constraint(spec):
+    CONSTRAINT_TYPES[spec.name] = spec
+
+def constraint_key(c):
+    """Registry key for a constraint; eq against a house number is its own entry."""
+    if not isinstance(c, dict):
+        return None
+    if c.get("type") == "eq" and "var2int" in c:
+        return "eq_int"
+    return c.get("type")
+
+def check_categories(solver, c):
+    cat_list = c.get("categories")
+    if not isinstance(cat_list, list):
+        return f"'categories' missing or not a list in distinct_categories: {c}"
+    for cat_name in cat_list:
+        if not isinstance(cat_name, str) or cat_name not in solver.categories:
+            return f"Unknown category '{cat_name}' in distinct_categories: {c}"
+    return None
+
+def encode_between(solver, c):
+    enc = solver.encoding
+    x, a, b = c["var1"], c["var2"], c["var3"]
+    return Or(And(enc.lt(a, x), enc.lt(x, b)), And(enc.lt(b, x), enc.lt(x, a)))
+
+for spec in [
+    ConstraintType("distinct_categories", check=check_categories, base=True,
+                   encode=lambda s, c: And([s.encoding.distinct(s.categories[name]) for name in c["categories"]])),
+    ConstraintType("range", numbers=("from", "to"), base=True,
+                   encode=lambda s, c: s.encoding.range(c["from"], c["to"])),
+    ConstraintType("eq_int", items=("var1",), numbers=("var2int",),
+                   encode=lambda s, c: s.encoding.eq_int(c["var1"], c["var2int"])),
+    ConstraintType("eq", items=("var1", "var2"),
+                   encode=lambda s, c: s.encoding.eq(c["var1"], c["var2"])),
+    ConstraintType("neq", items=("var1",), numbers=("var2int",),
+                   encode=lambda s, c: s.encoding.neq_int(c["var1"], c["var2int"])),
+    ConstraintType("eq_offset", items=("var1", "var2"), numbers=("offset",),
+                   encode=lambda s, c: s.encoding.offset(c["var1"], c["var2"], c["offset"])),
+    ConstraintType("neighbor", items=("var1", "var2"),
+                   encode=lambda s, c: s.encoding.neighbor(c["var1"], c["var2"])),
+    ConstraintType("not_neighbor", items=("var1", "var2"),
+                   encode=lambda s, c: Not(s.encoding.neighbor(c["var1"], c["var2"]))),
+    ConstraintType("ImmediateLeft", items=("var1", "var2"),
+                   encode=lambda s, c: s.encoding.offset(c["var1"], c["var2"], -1)),
+    ConstraintType("ImmediateRight", items=("var1", "var2"),
+                   encode=lambda s, c: s.encoding.offset(c["var1"], c["var2"], 1)),
+    ConstraintType("rightOf", items=("var1", "var2"),
+                   encode=lambda s, c: s.encoding.lt(c["var2"], c["var1"])),
+    ConstraintType("leftOf", items=("var1", "var2"),
+                   encode=lambda s, c: s.encoding.lt(c["var1"], c["var2"])),
+    ConstraintType("abs_diff", items=("var1", "var2"), numbers=("diff",),
+                   encode=lambda s, c: s.encoding.abs_diff(c["var1"], c["var2"], c["diff"])),
+    # var1 lies strictly between var2 and var3, in either order.
+    ConstraintType("between", items=("var1", "var2", "var3"), encode=encode_between),
+]:
+    register_constraint(spec)
 
 class ZebraSolver:
-    def __init__(self, puzzle):
+    def __init__(self, puzzle, incremental=False, encoding="int", timeout=None, max_memory=None, deadline=None):
+        """
+        With incremental=True the base encoding (distinct_categories/range) is asserted
+        once and every other constraint is guarded by its own assumption literal, so
+        diagnose() can re-check any subset on the same solver without rebuilding it.
+
+        encoding picks how house positions are represented (see z3_encodings):
+        "int" (default), "bitvec" or "onehot". The finite encodings always keep
+        positions inside the puzzle's range, or 1..houses_count without one.
+
+        timeout (seconds) and max_memory (MB) bound every check on this solver. A
+        check that runs out of either returns unknown: solve() then leaves
+        self.status as "unknown" with Z3's reason in self.reason_unknown.
+        deadline (a time.monotonic() value) bounds all checks together: each one
+        gets at most the time left, and once it has passed checks return unknown
+        with self.deadline_passed set.
+        self.check_seconds sums the time spent in checks.
+        """
         self.solver = Solver()
+        self.timeout = timeout
+        self.deadline = deadline
+        self.deadline_passed = False
+        if timeout:
+            self.solver.set("timeout", int(timeout * 1000))
+        if max_memory:
+            self.solver.set("max_memory", int(max_memory))
+        self.status = None
+        self.reason_unknown = None
+        self.check_seconds = 0.0
         self.houses_count = puzzle["houses_count"]
         self.categories = puzzle["categories"]
         self.constraints = puzzle["constraints"]
+        self.incremental = incremental
 
-        self.item_vars = {}
-        for cat_name, items in self.categories.items():
-            for item in items:
-                self.item_vars[item] = Int(item)
+        items = []
+        for cat_name, cat_items in self.categories.items():
+            for item in cat_items:
+                if item not in items:
+                    items.append(item)
+        low, high = self.house_domain()
+        self.encoding = ENCODINGS[encoding](items, low, high, self.max_constant())
+        self.item_vars = self.encoding.vars
 
         self.errors = []
+        # (assumption literal, index into self.constraints) for incremental mode
+        self.tracked = []
+        self.constraints_added = False
 
-    def add_constraints(self):
+    def house_domain(self):
         for c in self.constraints:
-            ctype = c["type"]
-            if ctype == "distinct_categories":
-                if "categories" not in c:
-                    self.errors.append(f"Missing 'categories' in distinct_categories: {c}")
-                    continue
-
-                cat_list = c["categories"]
-                if not isinstance(cat_list, list):
-                    self.errors.append(f"'categories' not a list in distinct_categories: {c}")
-                    continue
-
-                for cat_name in cat_list:
-                    if cat_name not in self.categories:
-                        self.errors.append(f"Unknown category '{cat_name}' in distinct_categories: {c}")
-                        continue
-                    cat_items = self.categories[cat_name]
-                    self.solver.add(Distinct([self.item_vars[it] for it in cat_items]))
-
-            elif ctype == "range":
-                low = c.get("from")
-                high = c.get("to")
-                if low is None or high is None:
-                    self.errors.append(f"range constraint missing 'from' or 'to': {c}")
-                    continue
-                for it in self.item_vars:
-                    self.solver.add(self.item_vars[it] >= low, self.item_vars[it] <= high)
-
-        for c in self.constraints:
-            ctype = c["type"]
-            if ctype in ("distinct_categories", "range"):
-                continue
-
-            if ctype == "eq":
-                var1 = c.get("var1")
-                if not var1 or var1 not in self.item_vars:
-                    self.errors.append(f"eq referencing missing/unknown var1: {c}")
-                    continue
+            # Non-object constraints are reported by compile(); skip them here.
+            if isinstance(c, dict) and c.get("type") == "range" and isinstance(c.get("from"), int) and isinstance(c.get("to"), int):
+                return c["from"], c["to"]
+        return 1, self.houses_count
 
-                if "var2int" in c:
-                    self.solver.add(self.item_vars[var1] == c["var2int"])
-                else:
-                    var2 = c.get("var2")
-                    if not var2 or var2 not in self.item_vars:
-                        self.errors.append(f"eq referencing missing/unknown var2: {c}")
-                        continue
-                    self.solver.add(self.item_vars[var1] == self.item_vars[var2])
-
-            elif ctype == "eq_offset":
-                var1 = c.get("var1")
-                var2 = c.get("var2")
-                offset = c.get("offset")
-                if (not var1 or not var2 or offset is None
-                        or var1 not in self.item_vars or var2 not in self.item_vars):
-                    self.errors.append(f"eq_offset missing/unknown var1/var2/offset: {c}")
-                    continue
-                self.solver.add(self.item_vars[var1] == self.item_vars[var2] + offset)
-
-            elif ctype == "neighbor":
-                var1 = c.get("var1")
-                var2 = c.get("var2")
-                if not var1 or not var2 or var1 not in self.item_vars or var2 not in self.item_vars:
-                    self.errors.append(f"neighbor referencing unknown items: {c}")
-                    continue
-                self.solver.add(Or(
-                    self.item_vars[var1] == self.item_vars[var2] + 1,
-                    self.item_vars[var1] == self.item_vars[var2] - 1
-                ))
-
-            elif ctype == "neq":
-                var1 = c.get("var1")
-                var2int = c.get("var2int")
-                if not var1 or var2int is None or var1 not in self.item_vars:
-                    self.errors.append(f"neq referencing unknown var or missing var2int: {c}")
-                    continue
-                self.solver.add(self.item_vars[var1] != var2int)
-
-            elif ctype == "ImmediateLeft":
-                var1 = c.get("var1")
-                var2 = c.get("var2")
-                if not var1 or not var2 or var1 not in self.item_vars or var2 not in self.item_vars:
-                    self.errors.append(f"left referencing unknown items: {c}")
-                    continue
-                self.solver.add(self.item_vars[var1] == self.item_vars[var2] - 1)
-
-            elif ctype == "ImmediateRight":
-                var1 = c.get("var1")
-                var2 = c.get("var2")
-                if not var1 or not var2 or var1 not in self.item_vars or var2 not in self.item_vars:
-                    self.errors.append(f"right referencing unknown items: {c}")
-                    continue
-                self.solver.add(self.item_vars[var1] == self.item_vars[var2] + 1)
-            elif ctype == "rightOf":
-                var1 = c.get("var1")
-                var2 = c.get("var2")
-                if not var1 or not var2 or var1 not in self.item_vars or var2 not in self.item_vars:
-                    self.errors.append(f"gt referencing unknown items: {c}")
-                    continue
-                self.solver.add(self.item_vars[var1] > self.item_vars[var2])
-
-            elif ctype == "leftOf":
-                var1 = c.get("var1")
-                var2 = c.get("var2")
-                if not var1 or not var2 or var1 not in self.item_vars or var2 not in self.item_vars:
-                    self.errors.append(f"lt referencing unknown items: {c}")
-                    continue
-                self.solver.add(self.item_vars[var1] < self.item_vars[var2])
-
-            elif ctype == "abs_diff":
-                var1 = c.get("var1")
-                var2 = c.get("var2")
-                diff = c.get("diff")
-                if not var1 or not var2 or diff is None or var1 not in self.item_vars or var2 not in self.item_vars:
-                    self.errors.append(f"abs_diff missing/unknown var1/var2/diff: {c}")
-                    continue
-                self.solver.add(Abs(self.item_vars[var1] - self.item_vars[var2]) == diff)
+    def max_constant(self):
+        constants = [c.get(k) for c in self.constraints if isinstance(c, dict) for k in ("offset", "diff", "var2int")]
+        return max([abs(v) for v in constants if isinstance(v, int)], default=0)
 
+    def compile(self):
+        """
+        Validates every constraint in one pass, before any Z3 term is built. Returns
+        (index, ConstraintType, constraint) for the valid ones; the rest go to self.errors.
+        """
+        compiled = []
+        for i, c in enumerate(self.constraints):
+            key = constraint_key(c)
+            spec = CONSTRAINT_TYPES.get(key)
+            if spec is None:
+                self.errors.append(f"Unknown constraint type '{key}': {c}")
+                continue
+            error = spec.validate(self, c)
+            if error:
+                self.errors.append(error)
+                continue
+            compiled.append((i, spec, c))
+        return compiled
 
+    def add_constraints(self):
+        self.constraints_added = True
+        compiled = self.compile()
+        self.solver.add(*self.encoding.domain())
+        for i, spec, c in compiled:
+            expr = spec.encode(self, c)
+            if spec.base or not self.incremental:
+                self.solver.add(expr)
             else:
-                self.errors.append(f"Unknown constraint type '{ctype}': {c}")
+                literal = Bool(f"constraint_{i}")
+                self.solver.add(Implies(literal, expr))
+                self.tracked.append((literal, i))
+
+    def check(self, literals=None):
+        """Checks the current assertions; in incremental mode only the given (default: all) tracked constraints are active."""
+        start = time.perf_counter()
+        if self.incremental and literals is None:
+            literals = [lit for lit, _ in self.tracked]
+        # Whether the deadline, rather than the per-check timeout, limits this check.
+        deadline_bound = False
+        if self.deadline is not None:
+            left = self.deadline - time.monotonic()
+            if left <= 0:
+                self.deadline_passed = True
+                self.reason_unknown = "deadline passed"
+                return unknown
+            deadline_bound = not self.timeout or left < self.timeout
+            self.solver.set("timeout", max(1, int(min(left, self.timeout or left) * 1000)))
+        try:
+            result = self.solver.check(*(literals if self.incremental else []))
+        except Z3Exception as e:
+            # Running out of max_memory raises instead of returning unknown.
+            self.check_seconds += time.perf_counter() - start
+            self.reason_unknown = e.value.decode() if isinstance(e.value, bytes) else str(e.value)
+            return unknown
+        self.check_seconds += time.perf_counter() - start
+        if result == unknown:
+            self.reason_unknown = self.solver.reason_unknown()
+            self.deadline_passed = deadline_bound and self.reason_unknown in ("timeout", "canceled")
+        return result
 
     def solve(self):
-        self.add_constraints()
+        if not self.constraints_added:
+            self.add_constraints()
 
         if self.errors:
-            print("Constraint loading encountered errors:")
-            for e in self.errors:
-                print(f"  - {e}")
+            log.warning("Constraint loading encountered errors:\n%s", "\n".join(f"  - {e}" for e in self.errors))
             return None
 
-        print("Z3 Constraints Added:")
-        print(self.solver)
+        # Lazy %s: the solver is only pretty-printed if DEBUG output is actually written.
+        log.debug("Z3 constraints added:\n%s", self.solver)
 
-        result = self.solver.check()
+        result = self.check()
+        self.status = str(result)
         if result == sat:
             model = self.solver.model()
             solution = {}
             for it in self.item_vars:
-                solution[it] = model[self.item_vars[it]].as_long()
+                solution[it] = self.encoding.value(model, it)
             return solution
 
-        print("No solution found.")
+        if result == unknown:
+            log.warning("Solver gave up: %s", self.reason_unknown)
+        else:
+            log.info("No solution found.")
         return None
+
+    def enumerate_solutions(self, limit=10, first=None):
+        """
+        Returns up to `limit` distinct solutions, found by blocking each model in turn,
+        or None if a check gives up (timeout / memory limit) before the search is
+        finished. `first` is a solution already found by solve(); it is counted
+        without checking again. Runs inside push/pop so the solver is left as it was
+        for solve()/diagnose().
+        """
+        if not self.constraints_added:
+            self.add_constraints()
+        if self.errors:
+            return []
+
+        solutions = []
+        self.solver.push()
+        try:
+            if first is not None:
+                solutions.append(first)
+                self.block(first)
+            while len(solutions) < limit:
+                result = self.check()
+                if result == unsat:
+                    break
+                if result != sat:
+                    log.warning("Solver gave up while enumerating solutions: %s", self.reason_unknown)
+                    return None
+                model = self.solver.model()
+                solution = {it: self.encoding.value(model, it) for it in self.item_vars}
+                solutions.append(solution)
+                self.block(solution)
+        finally:
+            self.solver.pop()
+        return solutions
+
+    def block(self, solution):
+        self.solver.add(Or([Not(self.encoding.has_value(it, v)) for it, v in solution.items()]))
+
+    def count_solutions(self, limit=2, first=None):
+        """
+        Number of solutions, capped at limit, or None if Z3 gave up before it could
+        tell. The default of 2 is enough to tell unique from ambiguous.
+        """
+        solutions = self.enumerate_solutions(limit, first)
+        return None if solutions is None else len(solutions)
+
+    def unsat_core(self, minimize=True):
+        """
+        Indices of a set of constraints that is UNSAT on its own, from Z3's core over
+        the assumption literals (one per tracked constraint). With minimize=True the
+        core is shrunk by dropping one constraint at a time, so every remaining one is
+        needed. Returns None unless the puzzle is UNSAT, and [] when the base
+        distinct/range encoding alone is UNSAT.
+        """
+        if not self.incremental:
+            raise ValueError("unsat_core() needs ZebraSolver(puzzle, incremental=True)")
+        if not self.constraints_added:
+            self.add_constraints()
+
+        if self.check() != unsat:
+            return None
+        index_of = {str(literal): i for literal, i in self.tracked}
+        core = self.core_literals([literal for literal, _ in self.tracked])
+        if minimize:
+            i = 0
+            while i < len(core):
+                trial = core[:i] + core[i + 1:]
+                if self.check(trial) == unsat:
+                    core = self.core_literals(trial)
+                else:
+                    i += 1
+        return sorted(index_of[str(literal)] for literal in core)
+
+    def core_literals(self, literals):
+        """The given literals that appear in the last check's unsat core, in their original order."""
+        in_core = {str(literal) for literal in self.solver.unsat_core()}
+        return [literal for literal in literals if str(literal) in in_core]
+
+    def diagnose(self):
+        """
+        Works out which constraints break satisfiability, reusing the incremental
+        solver. Each constraint is checked on its own against the base encoding, and
+        in order against the constraints accepted so far; a constraint that conflicts
+        with the accepted set is reported and left out so later ones are still judged
+        against a consistent set.
+        """
+        if not self.incremental:
+            raise ValueError("diagnose() needs ZebraSolver(puzzle, incremental=True)")
+        if not self.constraints_added:
+            self.add_constraints()
+
+        report = {
+            "base_status": str(self.check([])),
+            "constraints": [],
+            "conflicting": [],
+            "errors": list(self.errors)
+        }
+        accepted = []
+        for literal, index in self.tracked:
+            alone = self.check([literal]) == sat
+            with_accepted = self.check(accepted + [literal]) == sat
+            if with_accepted:
+                accepted.append(literal)
+            else:
+                report["conflicting"].append(index)
+            report["constraints"].append({
+                "index": index,
+                "constraint": self.constraints[index],
+                "consistent_alone": alone,
+                "consistent_with_previous": with_accepted
+            })
+        return report
+
 # puzzle_6 = {
 #     "houses_count": 2,
 #     "categories": {
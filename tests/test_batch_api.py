@@ -0,0 +1,142 @@
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# The provider clients are created at import time and need a key, even a fake one.
+for key in ("OPENAI_API_KEY", "DEEPSEEK_API_KEY", "MISTRAL_API_KEY"):
+    os.environ.setdefault(key, "test")
+
+from openai import AsyncOpenAI
+from src import openai_solver
+from src.batch_api import run_batch
+from src.logger import load_log_entries
+
+PUZZLES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "puzzles.json")
+# This request comes back in the error file, like a request the provider rejected.
+FAILING_REQUEST = "puzzle_2:convert"
+
+class BatchStub(BaseHTTPRequestHandler):
+    """
+    The files and batches endpoints of the Batch API. A batch answers every solve
+    request with the ground truth and every convert request with the official
+    z3_format, and reports "in_progress" on its first poll.
+    """
+    protocol_version = "HTTP/1.1"
+    puzzles, files, batches = {}, {}, {}
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, body):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def new_file(self, text):
+        file_id = f"file-{len(self.files)}"
+        self.files[file_id] = text
+        return file_id
+
+    def batch(self, batch_id):
+        batch = self.batches[batch_id]
+        done = batch["polls"] > 1
+        return {"id": batch_id, "object": "batch", "endpoint": "/v1/chat/completions",
+                "input_file_id": batch["input_file_id"], "completion_window": "24h", "created_at": 0,
+                "status": "completed" if done else "in_progress",
+                "output_file_id": batch["output_file_id"] if done else None,
+                "error_file_id": batch["error_file_id"] if done else None,
+                "request_counts": {"total": batch["total"], "completed": batch["total"] if done else 0, "failed": 0}}
+
+    def answer(self, request):
+        name, kind = request["custom_id"].split(":")
+        if request["custom_id"] == FAILING_REQUEST:
+            return False, {"custom_id": request["custom_id"], "error": None,
+                           "response": {"status_code": 400, "body": {"error": {"message": "rejected"}}}}
+        answer = self.puzzles[name]["ground_truth_dict" if kind == "solve" else "z3_format"]
+        body = {"choices": [{"index": 0, "message": {"role": "assistant",
+                                                     "content": "```json\n" + json.dumps(answer) + "\n```"}}],
+                "usage": {"total_tokens": 42}}
+        return True, {"custom_id": request["custom_id"], "error": None,
+                      "response": {"status_code": 200, "body": body}}
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.endswith("/files"):
+            content = re.search(rb"filename=\"[^\"]*\"\r\nContent-Type: [^\r]*\r\n\r\n(.*?)\r\n--", data, re.S)
+            file_id = self.new_file(content.group(1).decode())
+            return self.reply({"id": file_id, "object": "file", "bytes": len(content.group(1)), "created_at": 0,
+                               "filename": "requests.jsonl", "purpose": "batch", "status": "processed"})
+        body = json.loads(data)
+        output, errors = [], []
+        for line in self.files[body["input_file_id"]].splitlines():
+            ok, record = self.answer(json.loads(line))
+            (output if ok else errors).append(json.dumps(record))
+        batch_id = f"batch-{len(self.batches)}"
+        self.batches[batch_id] = {"polls": 0, "input_file_id": body["input_file_id"],
+                                  "output_file_id": self.new_file("\n".join(output)),
+                                  "error_file_id": self.new_file("\n".join(errors)),
+                                  "total": len(output) + len(errors)}
+        self.reply(self.batch(batch_id))
+
+    def do_GET(self):
+        content = re.search(r"/files/([^/]+)/content$", self.path)
+        if content:
+            return self.reply(self.files[content.group(1)].encode())
+        batch_id = self.path.rsplit("/", 1)[-1]
+        self.batches[batch_id]["polls"] += 1
+        self.reply(self.batch(batch_id))
+
+@pytest.fixture
+def puzzles():
+    with open(PUZZLES_FILE, "r") as f:
+        data = json.load(f)
+    return {name: data[name] for name in ("puzzle_1", "puzzle_2")}
+
+@pytest.fixture
+def batch_server(puzzles, monkeypatch):
+    BatchStub.puzzles, BatchStub.files, BatchStub.batches = puzzles, {}, {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BatchStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    # The module's client read OPENAI_BASE_URL when it was imported; make one that sees the stub.
+    monkeypatch.setattr(openai_solver, "async_client", AsyncOpenAI(max_retries=0))
+    yield BatchStub
+    server.shutdown()
+    server.server_close()
+
+def test_batch_round_trip_logs_every_puzzle(tmp_path, puzzles, batch_server):
+    job_file = str(tmp_path / "openai-baseline-full_test.job.json")
+    log_file = str(tmp_path / "batch.json")
+    job = run_batch(job_file, "openai", puzzles, "both", "baseline", log_file, poll_interval=0)
+
+    assert job["status"] == "logged"
+    assert job["batch_status"] == "completed"
+    assert batch_server.batches[job["batch_id"]]["polls"] == 2
+    entries = {entry["puzzle"]: entry for entry in load_log_entries(log_file)}
+    assert sorted(entries) == ["puzzle_1", "puzzle_2"]
+    for entry in entries.values():
+        assert entry["llm_provider"] == "openai"
+        assert entry["variant"] == "full_test"
+        assert entry["solve_accuracy"] == 1.0
+        assert entry["solve_token_usage"] == 42
+    assert entries["puzzle_1"]["convert_solver_status"] == "sat"
+    assert entries["puzzle_1"]["convert_solver_accuracy"] == 1.0
+    assert entries["puzzle_2"]["convert_constraints"] == "N/A"
+    assert entries["puzzle_2"]["error"] != "N/A"
+
+def test_rerun_does_not_submit_again(tmp_path, puzzles, batch_server):
+    job_file = str(tmp_path / "openai-baseline-full_test.job.json")
+    log_file = str(tmp_path / "batch.json")
+    job = run_batch(job_file, "openai", puzzles, "both", "baseline", log_file, poll_interval=0, wait=False)
+    assert job["status"] != "logged"
+    job = run_batch(job_file, "openai", puzzles, "both", "baseline", log_file, poll_interval=0)
+    assert job["status"] == "logged"
+    assert len(batch_server.batches) == 1
+    assert len(load_log_entries(log_file)) == 2
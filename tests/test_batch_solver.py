@@ -0,0 +1,16 @@
+import json
+import os
+
+from src.batch_solver import solve_job
+
+PUZZLES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "puzzles.json")
+
+def largest_puzzle():
+    with open(PUZZLES_FILE, "r") as f:
+        puzzles = [p["z3_format"] for p in json.load(f).values() if "z3_format" in p]
+    return max(puzzles, key=lambda p: len(p["categories"]) * p["houses_count"])
+
+def test_job_without_time_left_reports_timeout():
+    result = solve_job(largest_puzzle(), backend="z3", timeout=1e-6)
+    assert result["status"] == "timeout"
+    assert result["solution"] is None
@@ -0,0 +1,15 @@
+from src.json_extract import locate_json
+
+def test_failed_object_does_not_yield_its_members():
+    assert locate_json('{"explanation": "values are "1", "2"", "solution": {}}') == (None, None)
+
+def test_prose_object_is_skipped():
+    assert locate_json('Map {name: house} to houses: {"a": 1}') == ('{"a": 1}', {"a": 1})
+
+def test_repairs_python_dict():
+    assert locate_json("Answer: {'a': True, 'b': None,}")[1] == {"a": True, "b": None}
+
+def test_many_failed_candidates():
+    # Each "{a}" is skipped by scanning past it, not by re-reading the rest of the text.
+    text = "{a} " * 20000 + '{"b": 2}'
+    assert locate_json(text) == ('{"b": 2}', {"b": 2})
@@ -0,0 +1,44 @@
+import json
+import os
+
+import pytest
+
+from src.logger import Logger, result_files
+
+def entry(n):
+    return {"puzzle": f"puzzle_{n}", "llm_provider": "openai", "strategy": "baseline", "variant": "solve",
+            "solve_dict_str": "{}", "convert_constraints": "N/A"}
+
+def write_log(path, entries):
+    """A log written without an index, as by a version that predates it."""
+    with open(path, "w") as f:
+        if path.endswith(".jsonl"):
+            f.writelines(json.dumps(e) + "\n" for e in entries)
+        else:
+            json.dump(entries, f)
+
+@pytest.mark.parametrize("fmt", ["json", "jsonl"])
+def test_index_covers_log_written_before_it(tmp_path, fmt):
+    log_file = str(tmp_path / f"log.{fmt}")
+    write_log(log_file, [entry(n) for n in range(51)])
+    logger = Logger(log_file)
+    logger.write_entry(entry(51))
+    logger.close()
+    assert len(Logger(log_file).completed_cells()) == 52
+
+@pytest.mark.parametrize("fmt", ["json", "jsonl"])
+def test_index_catches_up_with_unindexed_writes(tmp_path, fmt):
+    log_file = str(tmp_path / f"log.{fmt}")
+    logger = Logger(log_file)
+    logger.write_entry(entry(0))
+    logger.close()
+    write_log(log_file, [entry(n) for n in range(5)])
+    logger = Logger(log_file)
+    logger.write_entry(entry(5))
+    logger.close()
+    assert len(logger.completed_cells()) == 6
+
+def test_result_files_lists_both_formats(tmp_path):
+    for name in ("a.json", "b.jsonl", "b.jsonl.lock", "b.jsonl.index", "log.json", "testing_log.jsonl"):
+        (tmp_path / name).write_text("")
+    assert [os.path.basename(p) for p in result_files(str(tmp_path))] == ["a.json", "b.jsonl"]
@@ -0,0 +1,40 @@
+import json
+import os
+
+import pytest
+
+from src.batch_solver import solve_job
+from src.propagation_solver import PropagationIncomplete, PropagationSolver
+
+PUZZLES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "puzzles.json")
+
+def base_puzzle():
+    with open(PUZZLES_FILE, "r") as f:
+        return json.load(f)["puzzle_1"]["z3_format"]
+
+def malformed_puzzles():
+    """JSON that parses but has the wrong shape, as LLM conversions sometimes do."""
+    base = base_puzzle()
+    return {
+        "string constraint": dict(base, constraints=base["constraints"] + ["eq Eric 1"]),
+        "constraints not a list": dict(base, constraints="nope"),
+        "list as category name": dict(base, constraints=base["constraints"] + [
+            {"type": "distinct_categories", "categories": [["a", "b"]]}]),
+        "list as item": dict(base, categories={**base["categories"], "extra": [["a", "b"]]}),
+        "no houses_count": {k: v for k, v in base.items() if k != "houses_count"},
+    }
+
+@pytest.mark.parametrize("name", sorted(malformed_puzzles()))
+def test_malformed_puzzle_is_left_to_z3(name):
+    with pytest.raises(PropagationIncomplete):
+        PropagationSolver(malformed_puzzles()[name]).enumerate_solutions(2)
+
+def test_string_constraint_reaches_z3_validation():
+    result = solve_job(malformed_puzzles()["string constraint"])
+    assert result["status"] == "error"
+    assert any("Unknown constraint type" in e for e in result["errors"])
+
+def test_missing_houses_count_fails_like_z3():
+    result = solve_job(malformed_puzzles()["no houses_count"])
+    assert result["status"] == "error"
+    assert result["solution"] is None